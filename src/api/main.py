@@ -1,37 +1,66 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from ..core.logging import setup_logging
 from ..core.config import settings
+from ..services.graph import close_http_client, init_http_client
 from .routers import health, invoice
 
 logger = setup_logging()
-app = FastAPI(title="ADL M365 Automation Starter")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled outbound connections (Teams webhook) live for the app's lifetime
+    await init_http_client()
+    yield
+    await close_http_client()
+
+
+# orjson serializes the JSON endpoints (validate, approvals listings) several
+# times faster than the stdlib encoder FastAPI uses by default
+app = FastAPI(
+    title="ADL M365 Automation Starter",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+
+_BODY_PREVIEW_BYTES = 2048
 
 
 # Add custom exception handler for validation errors
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logger.error(f"Validation error: {exc.errors()}")
-    logger.error(f"Request body: {await request.body()}")
+    # Read the body once and echo only a bounded preview; invalid requests are
+    # exactly the ones most likely to carry oversized payloads
+    body = await request.body()
+    body_preview = body[:_BODY_PREVIEW_BYTES].decode("utf-8", "replace")
+    errors = exc.errors()
+    logger.error(f"Validation error: {errors}")
+    logger.error(f"Request body: {body_preview}")
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": exc.errors(), "body": str(await request.body())},
+        content={"detail": errors, "body": body_preview},
     )
 
 
 # Configure CORS to allow frontend access
 # CORS_ORIGINS can be set in .env as comma-separated list
 # Example: CORS_ORIGINS=http://localhost:3000,https://your-frontend.com
-allowed_origins = [origin.strip() for origin in settings.cors_origins.split(",")]
+# A frozenset makes the per-request origin check a hash lookup, and listing the
+# exact methods/headers lets preflights skip reflecting arbitrary headers
+allowed_origins = frozenset(settings.cors_origin_list)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
 )
 
 app.include_router(health.router)
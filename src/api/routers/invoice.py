@@ -1,11 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import HTMLResponse
+import hashlib
+import tempfile
+from operator import itemgetter
+from typing import Iterable, Iterator
+import orjson
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 from ..deps import ExtractResponse
-from ...services.form_recognizer import extract_invoice_fields
+from ...core.config import settings
+from ...services.form_recognizer import extract_invoice_fields_async
 from ...services.graph import post_approval_card
 from ...services.storage import approval_tracker
-from ...services.approval_rules import create_approval_rules
+from ...services.approval_rules import get_approval_rules
 from ...models.invoice import ApprovalRequest
 from ...services.events.event_publisher import get_event_publisher, InvoiceValidatedEvent
 
@@ -23,13 +29,123 @@ class ValidateRequest(BaseModel):
     bill_to_authorized: list[str] | None = None  # Optional list of authorized bill-to companies
 
 
+class ValidationChecks(BaseModel):
+    """Individual rule results reported by /invoices/validate"""
+
+    model_config = {"frozen": True}
+
+    amount_within_limit: bool
+    confidence_sufficient: bool
+    document_type_is_invoice: bool
+    document_type_not_receipt: bool
+    bill_to_authorized: bool
+
+
+class ValidationMetadata(BaseModel):
+    """Inputs and rule configuration behind a /invoices/validate decision"""
+
+    model_config = {"frozen": True}
+
+    amount: float
+    confidence: float
+    vendor: str | None = None
+    config: dict
+
+
 class ValidateResponse(BaseModel):
     """Response from /invoices/validate endpoint"""
 
     approved: bool
     reason: str
-    checks: dict
-    metadata: dict
+    checks: ValidationChecks
+    metadata: ValidationMetadata
+
+
+# Static HTML for the approve/reject landing pages, formatted per request
+# rather than rebuilt from f-strings
+_ALREADY_PROCESSED_HTML = """
+<html>
+    <body style="font-family: Arial; text-align: center; padding: 50px;">
+        <h2>⚠️ Already Processed</h2>
+        <p>This invoice was already {status}.</p>
+        <p>Decision made at: {decided_at}</p>
+    </body>
+</html>
+"""
+
+_DECISION_HTML = """
+<html>
+    <body style="font-family: Arial; text-align: center; padding: 50px;">
+        <h2>{heading}</h2>
+        <p><strong>Vendor:</strong> {vendor}</p>
+        <p><strong>Invoice #:</strong> {invoice_number}</p>
+        <p><strong>Total:</strong> {currency} {total}</p>
+        <hr>
+        <p style="color: {color};">{message}</p>
+    </body>
+</html>
+"""
+
+
+def _already_processed_page(approval: dict) -> HTMLResponse:
+    return HTMLResponse(
+        _ALREADY_PROCESSED_HTML.format(
+            status=approval["status"], decided_at=approval["decided_at"]
+        )
+    )
+
+
+def _decision_page(invoice_data: dict, heading: str, color: str, message: str) -> HTMLResponse:
+    return HTMLResponse(
+        _DECISION_HTML.format(
+            heading=heading,
+            vendor=invoice_data.get("vendor", "N/A"),
+            invoice_number=invoice_data.get("invoice_number", "N/A"),
+            currency=invoice_data.get("currency", ""),
+            total=invoice_data.get("total", 0),
+            color=color,
+            message=message,
+        )
+    )
+
+
+# Raw uploads stay in memory up to this size, then spill to a temp file
+_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Document exceeds the {settings.max_upload_bytes} byte upload limit",
+    )
+
+
+async def _spool_request_body(request: Request) -> tuple[tempfile.SpooledTemporaryFile, int]:
+    """
+    Stream a raw request body into a spooled temp file, enforcing the size cap.
+
+    Avoids holding the whole upload as one bytes object and rejects oversized
+    bodies with 413 as soon as the limit is crossed, rather than after the
+    full payload has been buffered. Returns the rewound file and the number of
+    bytes received, so callers don't have to measure it again.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.max_upload_bytes:
+                raise _upload_too_large()
+            spooled.write(chunk)
+        if not received:
+            raise HTTPException(
+                status_code=422, detail="No file provided (either multipart or raw body)"
+            )
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled, received
 
 
 @router.post("/extract", response_model=ExtractResponse)
@@ -46,19 +162,24 @@ async def extract(request: Request, file: UploadFile = File(None)):
     - Logic Apps (raw binary)
     - API clients like curl/Postman
     """
+    spooled = None
+    size_hint = None
     try:
         if file:
-            # Multipart form-data upload
-            content = await file.read()
+            # Multipart form-data upload: hand over the spooled temp file
+            # (rolls to disk past 1 MB) instead of reading it into memory
+            if file.size is not None and file.size > settings.max_upload_bytes:
+                raise _upload_too_large()
+            content = file.file
+            size_hint = file.size
         else:
             # Raw binary body (e.g., from Logic Apps)
-            content = await request.body()
-            if not content:
-                raise HTTPException(
-                    status_code=422, detail="No file provided (either multipart or raw body)"
-                )
+            spooled, size_hint = await _spool_request_body(request)
+            content = spooled
 
-        extracted = extract_invoice_fields(content)
+        # The Document Intelligence call takes seconds per document; awaiting it
+        # off the event loop keeps other requests being served
+        extracted = await extract_invoice_fields_async(content, size_hint=size_hint)
         return ExtractResponse(
             vendor=extracted.vendor,
             invoice_number=extracted.invoice_number,
@@ -73,10 +194,44 @@ async def extract(request: Request, file: UploadFile = File(None)):
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if spooled is not None:
+            spooled.close()
+
+
+def _validation_id(req: ValidateRequest, approved: bool) -> str:
+    """
+    Deterministic ID for a validation request and its outcome.
+
+    Derived from a digest rather than builtin ``hash()``, which is salted per
+    process, so the same request maps to the same ID across workers and
+    restarts and downstream consumers can de-duplicate on it. The ID is also
+    the Service Bus message ID, so it covers everything that can change the
+    decision (content, bill-to, outcome): distinct validations must never
+    collide and be dropped by broker duplicate detection.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(
+        f"{req.vendor!r}|{req.amount:.2f}|{req.confidence:.4f}|{req.bill_to!r}|{approved}|".encode()
+    )
+    hasher.update((req.content or "").encode())
+    return "validation-" + hasher.hexdigest()
+
+
+def _publish_validated_event(event: InvoiceValidatedEvent) -> None:
+    """Background task: publish a validation event, never failing the request"""
+    from loguru import logger
+
+    try:
+        get_event_publisher().publish_invoice_validated(event)
+        logger.info(f"Published InvoiceValidated event: approved={event.approved}")
+    except Exception as e:
+        # Don't fail validation if event publishing fails
+        logger.warning(f"Failed to publish event: {e}")
 
 
 @router.post("/validate", response_model=ValidateResponse)
-async def validate_for_approval(req: ValidateRequest):
+async def validate_for_approval(req: ValidateRequest, background_tasks: BackgroundTasks):
     """
     Validate invoice data against approval rules.
 
@@ -105,8 +260,9 @@ async def validate_for_approval(req: ValidateRequest):
         "checks": {
             "amount_within_limit": true,
             "confidence_sufficient": true,
-            "contains_invoice_keyword": true,
-            "does_not_contain_receipt_keyword": true
+            "document_type_is_invoice": true,
+            "document_type_not_receipt": true,
+            "bill_to_authorized": true
         },
         "metadata": {...}
     }
@@ -124,7 +280,7 @@ async def validate_for_approval(req: ValidateRequest):
             content_length=len(req.content) if req.content else 0,
         )
 
-        rules = create_approval_rules(allowed_bill_to_names=req.bill_to_authorized)
+        rules = get_approval_rules(req.bill_to_authorized)
         decision = rules.evaluate(
             amount=req.amount,
             confidence=req.confidence,
@@ -133,23 +289,18 @@ async def validate_for_approval(req: ValidateRequest):
             bill_to=req.bill_to,
         )
 
-        # Publish InvoiceValidated event to Service Bus
-        try:
-            event_publisher = get_event_publisher()
-            event = InvoiceValidatedEvent(
-                approval_id=f"validation-{hash((req.vendor, req.amount, req.confidence))}",
-                vendor=req.vendor or "Unknown",
-                invoice_number="N/A",  # Not available at validation stage
-                total=req.amount,
-                approved=decision.approved,
-                reason=decision.reason,
-                confidence=req.confidence,
-            )
-            event_publisher.publish_invoice_validated(event)
-            logger.info(f"Published InvoiceValidated event: approved={decision.approved}")
-        except Exception as e:
-            # Don't fail validation if event publishing fails
-            logger.warning(f"Failed to publish event: {e}")
+        # Publish InvoiceValidated event to Service Bus once the response is sent,
+        # so the broker round trip isn't part of validation latency
+        event = InvoiceValidatedEvent(
+            approval_id=_validation_id(req, decision.approved),
+            vendor=req.vendor or "Unknown",
+            invoice_number="N/A",  # Not available at validation stage
+            total=req.amount,
+            approved=decision.approved,
+            reason=decision.reason,
+            confidence=req.confidence,
+        )
+        background_tasks.add_task(_publish_validated_event, event)
 
         return ValidateResponse(
             approved=decision.approved,
@@ -167,11 +318,14 @@ async def validate_for_approval(req: ValidateRequest):
 @router.post("/request-approval")
 async def request_approval(req: ApprovalRequest):
     """Post an approval request card to Teams with approve/reject buttons"""
+    # Serialize once; the card builder only reads the fields
+    invoice_data = req.model_dump()
+
     # Create approval record and get unique ID
-    approval_id = approval_tracker.create_approval(req.model_dump())
+    approval_id = approval_tracker.create_approval(invoice_data)
 
     # Post a card to Teams via incoming webhook with approval URLs
-    result = await post_approval_card(req.model_dump(), approval_id)
+    result = await post_approval_card(invoice_data, approval_id)
     return {"result": result, "approval_id": approval_id}
 
 
@@ -184,32 +338,17 @@ async def approve_invoice(approval_id: str):
         raise HTTPException(status_code=404, detail="Approval request not found")
 
     if approval["status"] != "pending":
-        return f"""
-        <html>
-            <body style="font-family: Arial; text-align: center; padding: 50px;">
-                <h2>⚠️ Already Processed</h2>
-                <p>This invoice was already {approval["status"]}.</p>
-                <p>Decision made at: {approval["decided_at"]}</p>
-            </body>
-        </html>
-        """
+        return _already_processed_page(approval)
 
     # Mark as approved
     approval_tracker.approve(approval_id)
 
-    invoice_data = approval["invoice_data"]
-    return f"""
-    <html>
-        <body style="font-family: Arial; text-align: center; padding: 50px;">
-            <h2>✅ Invoice Approved</h2>
-            <p><strong>Vendor:</strong> {invoice_data.get("vendor", "N/A")}</p>
-            <p><strong>Invoice #:</strong> {invoice_data.get("invoice_number", "N/A")}</p>
-            <p><strong>Total:</strong> {invoice_data.get("currency", "")} {invoice_data.get("total", 0)}</p>
-            <hr>
-            <p style="color: green;">Thank you! The invoice has been approved.</p>
-        </body>
-    </html>
-    """
+    return _decision_page(
+        approval["invoice_data"],
+        heading="✅ Invoice Approved",
+        color="green",
+        message="Thank you! The invoice has been approved.",
+    )
 
 
 @router.get("/approval/{approval_id}/reject", response_class=HTMLResponse)
@@ -221,81 +360,103 @@ async def reject_invoice(approval_id: str):
         raise HTTPException(status_code=404, detail="Approval request not found")
 
     if approval["status"] != "pending":
-        return f"""
-        <html>
-            <body style="font-family: Arial; text-align: center; padding: 50px;">
-                <h2>⚠️ Already Processed</h2>
-                <p>This invoice was already {approval["status"]}.</p>
-                <p>Decision made at: {approval["decided_at"]}</p>
-            </body>
-        </html>
-        """
+        return _already_processed_page(approval)
 
     # Mark as rejected
     approval_tracker.reject(approval_id)
 
-    invoice_data = approval["invoice_data"]
-    return f"""
-    <html>
-        <body style="font-family: Arial; text-align: center; padding: 50px;">
-            <h2>❌ Invoice Rejected</h2>
-            <p><strong>Vendor:</strong> {invoice_data.get("vendor", "N/A")}</p>
-            <p><strong>Invoice #:</strong> {invoice_data.get("invoice_number", "N/A")}</p>
-            <p><strong>Total:</strong> {invoice_data.get("currency", "")} {invoice_data.get("total", 0)}</p>
-            <hr>
-            <p style="color: red;">The invoice has been rejected.</p>
-        </body>
-    </html>
+    return _decision_page(
+        approval["invoice_data"],
+        heading="❌ Invoice Rejected",
+        color="red",
+        message="The invoice has been rejected.",
+    )
+
+
+# Listings are streamed in chunks of roughly this size rather than
+# serialized as one document
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _stream_json_list(head: bytes, items: Iterable[dict]) -> Iterator[bytes]:
     """
+    Stream ``{<head>[item, item, ...]}`` as JSON.
+
+    ``head`` is the already-encoded opening of the object up to the array,
+    e.g. ``b'{"approvals":'``. Items are encoded one at a time and flushed
+    in ~64 KB chunks, so the encoded response is never held as one bytes
+    object. The records themselves are not streamed: callers pass lists
+    already built by the tracker, so that memory still grows with the record
+    count.
+    """
+    buf = bytearray(head)
+    buf += b"["
+    separator = b""
+    for item in items:
+        buf += separator
+        buf += orjson.dumps(item)
+        separator = b","
+        if len(buf) >= _STREAM_CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    buf += b"]}"
+    yield bytes(buf)
+
+
+# Record fields read for every approved-invoice row, fetched in one C-level call
+_approved_row_fields = itemgetter("id", "invoice_data", "decided_by", "decided_at", "created_at")
+
+
+def _format_approved_invoice(approval: dict) -> dict:
+    approval_id, invoice, decided_by, decided_at, created_at = _approved_row_fields(approval)
+    return {
+        "approval_id": approval_id,
+        "vendor": invoice.get("vendor", "N/A"),
+        "invoice_number": invoice.get("invoice_number", "N/A"),
+        "invoice_date": invoice.get("invoice_date", "N/A"),
+        "total": invoice.get("total", 0),
+        "currency": invoice.get("currency", "USD"),
+        "confidence": invoice.get("confidence", 0),
+        "approval_type": "AI Auto-Approved" if decided_by == "system-auto" else "Human Approved",
+        "approved_by": decided_by,
+        "approved_at": decided_at,
+        "created_at": created_at,
+    }
 
 
 @router.get("/approvals")
 async def list_approvals():
     """List all approval requests (for debugging)"""
-    return {"approvals": approval_tracker.list_all()}
+    return StreamingResponse(
+        _stream_json_list(b'{"approvals":', approval_tracker.list_all()),
+        media_type="application/json",
+    )
 
 
 @router.get("/approvals/approved")
-async def list_approved_invoices():
+async def list_approved_invoices(
+    limit: int | None = Query(None, ge=1), offset: int = Query(0, ge=0)
+):
     """
-    List all approved invoices with approval details.
+    List approved invoices with approval details.
 
     Shows:
     - Invoice details (vendor, number, total, etc.)
     - Approval type (human vs AI auto-approved)
     - AI confidence level
     - Timestamp and approver
-    """
-    all_approvals = approval_tracker.list_all()
-
-    # Filter only approved invoices
-    approved = [a for a in all_approvals if a["status"] == "approved"]
-
-    # Format response
-    result = []
-    for approval in approved:
-        invoice = approval["invoice_data"]
-        result.append(
-            {
-                "approval_id": approval["id"],
-                "vendor": invoice.get("vendor", "N/A"),
-                "invoice_number": invoice.get("invoice_number", "N/A"),
-                "invoice_date": invoice.get("invoice_date", "N/A"),
-                "total": invoice.get("total", 0),
-                "currency": invoice.get("currency", "USD"),
-                "confidence": invoice.get("confidence", 0),
-                "approval_type": (
-                    "AI Auto-Approved"
-                    if approval["decided_by"] == "system-auto"
-                    else "Human Approved"
-                ),
-                "approved_by": approval["decided_by"],
-                "approved_at": approval["decided_at"],
-                "created_at": approval["created_at"],
-            }
-        )
-
-    # Sort by approval time, most recent first
-    result.sort(key=lambda x: x["approved_at"], reverse=True)
 
-    return {"total_approved": len(result), "invoices": result}
+    Supports paging via ``limit``/``offset`` (newest first); only the requested
+    page is formatted. ``total_approved`` is always the overall count. The body
+    is streamed, so large approval histories are never serialized into a
+    single in-memory document.
+    """
+    # Already filtered and ordered by approval time, most recent first
+    # (the total is read together with the page so the two always agree)
+    approved, total = approval_tracker.list_approved_with_count(limit=limit, offset=offset)
+
+    head = b'{"total_approved":%d,"invoices":' % total
+    return StreamingResponse(
+        _stream_json_list(head, map(_format_approved_invoice, approved)),
+        media_type="application/json",
+    )
@@ -1,7 +1,14 @@
+from functools import cached_property, lru_cache
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
+def _split_csv(value: str) -> tuple[str, ...]:
+    """Split a comma-separated setting into trimmed, non-empty entries"""
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
 class Settings(BaseSettings):
     app_name: str = Field("adl-m365-automation-starter", alias="APP_NAME")
     app_env: str = Field("dev", alias="APP_ENV")
@@ -34,6 +41,9 @@ class Settings(BaseSettings):
     # API Base URL (for approval links in Teams cards)
     api_base_url: str = Field("http://127.0.0.1:8000", alias="API_BASE_URL")
 
+    # Largest document accepted by /invoices/extract (bytes); larger uploads get 413
+    max_upload_bytes: int = Field(50 * 1024 * 1024, alias="MAX_UPLOAD_BYTES")
+
     # CORS allowed origins (comma-separated list for production deployment)
     cors_origins: str = Field("http://localhost:3000,http://127.0.0.1:3000", alias="CORS_ORIGINS")
 
@@ -53,5 +63,20 @@ class Settings(BaseSettings):
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
+    # Parsed forms of the comma-separated settings, computed once per instance
+    @cached_property
+    def cors_origin_list(self) -> tuple[str, ...]:
+        return _split_csv(self.cors_origins)
+
+    @cached_property
+    def approval_allowed_bill_to_list(self) -> tuple[str, ...]:
+        return _split_csv(self.approval_allowed_bill_to_names)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide Settings instance; env vars and .env are parsed once"""
+    return Settings()
+
 
-settings = Settings()
+settings = get_settings()
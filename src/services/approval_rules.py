@@ -5,9 +5,99 @@ Centralizes approval logic that can be tested, versioned, and reused
 across different automation tools (Logic Apps, etc.)
 """
 
+import hashlib
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from threading import Lock
 from loguru import logger
 from typing import Dict, Any, Literal
-from pydantic import BaseModel
+
+
+# Every phrase classify_document_type scores on. Each is searched for at most
+# once per document, and not at all when a phrase it contains is absent (e.g.
+# the "invoice number"/"invoice #" variants are skipped without "invoice").
+_DOCUMENT_CUES = (
+    "$0.00",
+    "****",
+    "account number",
+    "amount due",
+    "amount due: $0.00",
+    "amount paid",
+    "auto-recharge",
+    "autopay",
+    "balance due",
+    "balance due 0",
+    "balance due: $0.00",
+    "balance: $0.00",
+    "bank details",
+    "bpay",
+    "bsb",
+    "date paid",
+    "direct debit",
+    "direct deposit",
+    "due date",
+    "due upon receipt",
+    "eft details",
+    "ending",
+    "invoice",
+    "invoice #",
+    "invoice id",
+    "invoice no",
+    "invoice number",
+    "make payment to",
+    "mastercard",
+    "net 30",
+    "net 60",
+    "no payment required",
+    "paid on",
+    "payment due",
+    "payment history",
+    "payment received",
+    "payment required",
+    "payment terms",
+    "paypal",
+    "please pay",
+    "please remit",
+    "receipt",
+    "receipt #",
+    "receipt no",
+    "receipt number",
+    "remit payment",
+    "remit to",
+    "square",
+    "stripe",
+    "tax invoice / receipt",
+    "tax receipt",
+    "thank you for your payment",
+    "total due",
+    "transaction history",
+    "visa",
+    "we appreciate your business",
+    "wire transfer",
+    "your order is complete",
+)
+
+
+def _cue_scan_plan(cues: tuple[str, ...]) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    """Order cues shortest first, pairing each with the shorter cues it contains"""
+    ordered = sorted(cues, key=len)
+    return tuple(
+        (cue, tuple(other for other in ordered[:i] if other in cue))
+        for i, cue in enumerate(ordered)
+    )
+
+
+_CUE_SCAN_PLAN = _cue_scan_plan(_DOCUMENT_CUES)
+
+
+def _find_cues(t: str) -> set[str]:
+    """Return the document cues present in lowercased text ``t``"""
+    found = set()
+    for cue, contained in _CUE_SCAN_PLAN:
+        if all(c in found for c in contained) and cue in t:
+            found.add(cue)
+    return found
 
 
 def classify_document_type(text: str) -> Literal["receipt", "invoice", "unknown"]:
@@ -25,6 +115,9 @@ def classify_document_type(text: str) -> Literal["receipt", "invoice", "unknown"
     Negative score = Receipt (already paid)
     Near zero = Unknown/ambiguous
 
+    Results are memoized by a digest of the text, so re-validating the same
+    OCR text doesn't re-score it and the cache never keeps the text alive.
+
     Args:
         text: Full OCR text content from document
 
@@ -33,78 +126,130 @@ def classify_document_type(text: str) -> Literal["receipt", "invoice", "unknown"
     """
     if not text:
         return "unknown"
+    return _classify_by_digest(text, _content_digest(text))
+
+
+# Recent classifications keyed by content digest (16 bytes per entry)
+_CLASSIFY_CACHE_SIZE = 512
+_classify_cache: OrderedDict[bytes, str] = OrderedDict()
+_classify_cache_lock = Lock()
+
+
+def _content_digest(text: str) -> bytes:
+    """128-bit blake2b digest of OCR text, used as a cache key"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
 
-    t = text.lower()
+
+def _classify_by_digest(text: str, digest: bytes) -> Literal["receipt", "invoice", "unknown"]:
+    """Classify non-empty ``text`` whose ``_content_digest`` is ``digest``, memoized"""
+    with _classify_cache_lock:
+        doc_type = _classify_cache.get(digest)
+        if doc_type is not None:
+            _classify_cache.move_to_end(digest)
+            return doc_type
+
+    doc_type = _classify(text)
+
+    with _classify_cache_lock:
+        _classify_cache[digest] = doc_type
+        if len(_classify_cache) > _CLASSIFY_CACHE_SIZE:
+            _classify_cache.popitem(last=False)
+    return doc_type
+
+
+def _classify(text: str) -> Literal["receipt", "invoice", "unknown"]:
+    """Uncached weighted scoring (see classify_document_type)"""
+    found = _find_cues(text.lower())
     score = 0
 
     # ========== OBLIGATION CUES (+) ==========
     # These indicate payment is still owed
 
     # Strong obligation phrases (+3 each)
-    if "amount due" in t and "$0.00" not in t:
+    if "amount due" in found and "$0.00" not in found:
         score += 3
-    if "balance due" in t and "$0.00" not in t and "balance due 0" not in t:
+    if "balance due" in found and "$0.00" not in found and "balance due 0" not in found:
         score += 3
-    if "total due" in t and "$0.00" not in t:
+    if "total due" in found and "$0.00" not in found:
         score += 3
-    if "please remit" in t or "please pay" in t or "payment required" in t:
+    if "please remit" in found or "please pay" in found or "payment required" in found:
         score += 3
 
     # Payment terms indicate future payment (+4)
-    if "due date" in t or "payment due" in t:
+    if "due date" in found or "payment due" in found:
         score += 4
-    if "net 30" in t or "net 60" in t or "due upon receipt" in t or "payment terms" in t:
+    if (
+        "net 30" in found
+        or "net 60" in found
+        or "due upon receipt" in found
+        or "payment terms" in found
+    ):
         score += 4
 
     # Remittance/banking instructions (+3)
-    if "remit to" in t or "remit payment" in t or "make payment to" in t:
+    if "remit to" in found or "remit payment" in found or "make payment to" in found:
         score += 3
-    if "bank details" in t or "bsb" in t or "account number" in t or "eft details" in t:
+    if (
+        "bank details" in found
+        or "bsb" in found
+        or "account number" in found
+        or "eft details" in found
+    ):
         score += 3
-    if "wire transfer" in t or "bpay" in t or "direct deposit" in t:
+    if "wire transfer" in found or "bpay" in found or "direct deposit" in found:
         score += 3
 
     # Invoice identification (+2)
-    if "invoice" in t and "receipt" not in t:
+    if "invoice" in found and "receipt" not in found:
         score += 2
-    if "invoice number" in t or "invoice #" in t or "invoice no" in t or "invoice id" in t:
+    if (
+        "invoice number" in found
+        or "invoice #" in found
+        or "invoice no" in found
+        or "invoice id" in found
+    ):
         score += 2
 
     # ========== CONFIRMATION CUES (-) ==========
     # These indicate payment already completed
 
     # Payment confirmation phrases (-3 each)
-    if "thank you for your payment" in t or "payment received" in t:
+    if "thank you for your payment" in found or "payment received" in found:
         score -= 3
-    if "amount paid" in t or "paid on" in t or "date paid" in t:
+    if "amount paid" in found or "paid on" in found or "date paid" in found:
         score -= 3
-    if "payment history" in t or "transaction history" in t:
+    if "payment history" in found or "transaction history" in found:
         score -= 3
-    if "your order is complete" in t or "we appreciate your business" in t:
+    if "your order is complete" in found or "we appreciate your business" in found:
         score -= 3
 
     # Zero balance confirmation (-4)
-    if "$0.00" in t or "balance due 0" in t or "balance: $0.00" in t or "no payment required" in t:
+    if (
+        "$0.00" in found
+        or "balance due 0" in found
+        or "balance: $0.00" in found
+        or "no payment required" in found
+    ):
         score -= 4
-    if "balance due: $0.00" in t or "amount due: $0.00" in t:
+    if "balance due: $0.00" in found or "amount due: $0.00" in found:
         score -= 4
 
     # Payment method shown (-3) - indicates completed transaction
-    if "visa" in t and ("****" in t or "ending" in t):
+    if "visa" in found and ("****" in found or "ending" in found):
         score -= 3
-    if "mastercard" in t and ("****" in t or "ending" in t):
+    if "mastercard" in found and ("****" in found or "ending" in found):
         score -= 3
-    if "direct debit" in t or "auto-recharge" in t or "autopay" in t:
+    if "direct debit" in found or "auto-recharge" in found or "autopay" in found:
         score -= 3
-    if "paypal" in t or "stripe" in t or "square" in t:
+    if "paypal" in found or "stripe" in found or "square" in found:
         score -= 3
 
     # Receipt identification (-2)
-    if "receipt" in t and "invoice" not in t:
+    if "receipt" in found and "invoice" not in found:
         score -= 2
-    if "receipt number" in t or "receipt #" in t or "receipt no" in t:
+    if "receipt number" in found or "receipt #" in found or "receipt no" in found:
         score -= 2
-    if "tax invoice / receipt" in t or "tax receipt" in t:
+    if "tax invoice / receipt" in found or "tax receipt" in found:
         score -= 2
 
     # ========== CLASSIFICATION ==========
@@ -126,23 +271,30 @@ def classify_document_type(text: str) -> Literal["receipt", "invoice", "unknown"
         return "unknown"
 
 
-class ApprovalDecision(BaseModel):
-    """Result of an approval decision with explanation"""
+@dataclass(slots=True, frozen=True)
+class ApprovalDecision:
+    """
+    Result of an approval decision with explanation.
+
+    A plain slotted dataclass rather than a pydantic model: it is built by the
+    rules engine on every evaluation and only validated at the API boundary.
+    """
 
     approved: bool
     reason: str
     checks: Dict[str, bool]
-    metadata: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = field(default_factory=dict)
 
 
-class ApprovalRulesConfig(BaseModel):
+@dataclass(frozen=True, slots=True)
+class ApprovalRulesConfig:
     """Configuration for approval rules (loaded from environment)"""
 
     amount_threshold: float = 500.0
     min_confidence: float = 0.85
     require_invoice_keyword: bool = True
     reject_receipt_keyword: bool = True
-    allowed_bill_to_names: list[str] = []  # Whitelist of company names
+    allowed_bill_to_names: list[str] = field(default_factory=list)  # Whitelist of company names
 
 
 class InvoiceApprovalRules:
@@ -166,8 +318,19 @@ class InvoiceApprovalRules:
       This would catch data entry errors and potential fraud
     """
 
+    # Number of recent decisions memoized per rules instance
+    DECISION_CACHE_SIZE = 1024
+
     def __init__(self, config: ApprovalRulesConfig = None):
         self.config = config or ApprovalRulesConfig()
+        # Reported in every decision's metadata; dumped once per rules instance
+        self._config_dump = asdict(self.config)
+        # Whitelist normalized once; bill-to matching is case-insensitive
+        self._allowed_bill_to_folded = tuple(
+            name.casefold() for name in self.config.allowed_bill_to_names
+        )
+        self._decision_cache: OrderedDict[tuple, ApprovalDecision] = OrderedDict()
+        self._decision_cache_lock = Lock()
 
     def evaluate(
         self,
@@ -176,25 +339,72 @@ class InvoiceApprovalRules:
         content: str,
         vendor: str = None,
         bill_to: str = None,
+        detailed: bool = True,
         **kwargs,
     ) -> ApprovalDecision:
         """
         Evaluate whether an invoice should be auto-approved.
 
+        Decisions are memoized (LRU) on a fingerprint of the inputs - a digest
+        of the content plus the scalar fields - so Logic App retries and
+        re-validations of the same document skip re-scanning the OCR text.
+        Returned decisions are shared and must be treated as read-only.
+
         Args:
             amount: Invoice total amount
             confidence: Document Intelligence confidence score (0-1)
             content: Full OCR text content from the document
             vendor: Vendor name (optional, for future vendor-specific rules)
             bill_to: Customer/recipient name from invoice (critical security check)
+            detailed: Run every check and report all results (default). When
+                False, stop at the first failing cheap check and skip document
+                classification; ``checks`` then only holds the checks that ran.
             **kwargs: Additional fields for future rule extensions
 
         Returns:
             ApprovalDecision with approved flag, reason, and check details
         """
+        content_digest = _content_digest(content) if content else b""
+        key = (content_digest, amount, confidence, vendor, bill_to, detailed)
+
+        with self._decision_cache_lock:
+            decision = self._decision_cache.get(key)
+            if decision is not None:
+                self._decision_cache.move_to_end(key)
+
+        if decision is not None:
+            # Repeat validations still leave a decision record in the log
+            _log_decision(decision, cached=True)
+            return decision
+
+        decision = self._evaluate(
+            amount, confidence, content, content_digest, vendor, bill_to, detailed
+        )
+
+        with self._decision_cache_lock:
+            self._decision_cache[key] = decision
+            if len(self._decision_cache) > self.DECISION_CACHE_SIZE:
+                self._decision_cache.popitem(last=False)
+
+        return decision
+
+    def _evaluate(
+        self,
+        amount: float,
+        confidence: float,
+        content: str,
+        content_digest: bytes,
+        vendor: str = None,
+        bill_to: str = None,
+        detailed: bool = True,
+    ) -> ApprovalDecision:
+        """Uncached rule evaluation (see evaluate); reuses evaluate's content digest"""
         checks = {}
         reasons = []
 
+        # Cheap scalar checks run first; document classification scans the
+        # whole OCR text, so it goes last and can be skipped when not detailed
+
         # Check 1: Amount threshold
         amount_ok = amount <= self.config.amount_threshold
         checks["amount_within_limit"] = amount_ok
@@ -202,6 +412,8 @@ class InvoiceApprovalRules:
             reasons.append(
                 f"Amount ${amount:.2f} exceeds limit of ${self.config.amount_threshold:.2f}"
             )
+            if not detailed:
+                return self._decision(False, reasons, checks, amount, confidence, vendor)
 
         # Check 2: Confidence threshold
         confidence_ok = confidence >= self.config.min_confidence
@@ -210,10 +422,38 @@ class InvoiceApprovalRules:
             reasons.append(
                 f"Confidence {confidence:.1%} below minimum {self.config.min_confidence:.1%}"
             )
+            if not detailed:
+                return self._decision(False, reasons, checks, amount, confidence, vendor)
+
+        # Check 5: Bill To verification (critical security check)
+        # Verify invoice is addressed to our company (prevents fraud/misdirection)
+        bill_to_ok = True  # Default to pass if no whitelist configured
+        bill_to_reason = None
+        if self._allowed_bill_to_folded:
+            # Whitelist is configured - enforce it
+            if not bill_to:
+                # No bill_to extracted - fail check
+                bill_to_ok = False
+                bill_to_reason = "Bill To field not found on invoice"
+            else:
+                # Check if bill_to matches any whitelisted name (case-insensitive, partial match)
+                bill_to_folded = bill_to.casefold()
+                bill_to_ok = any(
+                    allowed in bill_to_folded for allowed in self._allowed_bill_to_folded
+                )
+                if not bill_to_ok:
+                    bill_to_reason = (
+                        f"Invoice not addressed to authorized company (found: '{bill_to}')"
+                    )
+
+        if not bill_to_ok and not detailed:
+            checks["bill_to_authorized"] = False
+            reasons.append(bill_to_reason)
+            return self._decision(False, reasons, checks, amount, confidence, vendor)
 
         # Check 3 & 4: Document type classification using heuristic signals
         # This is more robust than simple keyword matching
-        doc_type = classify_document_type(content)
+        doc_type = _classify_by_digest(content, content_digest) if content else "unknown"
         is_invoice = doc_type == "invoice"
         is_receipt = doc_type == "receipt"
 
@@ -229,28 +469,10 @@ class InvoiceApprovalRules:
         if self.config.reject_receipt_keyword and is_receipt:
             reasons.append("Document classified as receipt (not invoice)")
 
-        # Check 5: Bill To verification (critical security check)
-        # Verify invoice is addressed to our company (prevents fraud/misdirection)
-        bill_to_ok = True  # Default to pass if no whitelist configured
-        if self.config.allowed_bill_to_names:
-            # Whitelist is configured - enforce it
-            if not bill_to:
-                # No bill_to extracted - fail check
-                bill_to_ok = False
-                reasons.append("Bill To field not found on invoice")
-            else:
-                # Check if bill_to matches any whitelisted name (case-insensitive, partial match)
-                bill_to_lower = bill_to.lower()
-                bill_to_ok = any(
-                    allowed.lower() in bill_to_lower
-                    for allowed in self.config.allowed_bill_to_names
-                )
-                if not bill_to_ok:
-                    reasons.append(
-                        f"Invoice not addressed to authorized company (found: '{bill_to}')"
-                    )
-
+        # Bill To is reported after the document checks, as before reordering
         checks["bill_to_authorized"] = bill_to_ok
+        if bill_to_reason:
+            reasons.append(bill_to_reason)
 
         # Future: Add more sophisticated checks here
         # - Vendor whitelist/blacklist
@@ -260,41 +482,57 @@ class InvoiceApprovalRules:
         # - PO matching
 
         # Determine final decision
-        all_checks_passed = all(
-            [
-                amount_ok,
-                confidence_ok,
-                (is_invoice if self.config.require_invoice_keyword else True),
-                (not is_receipt if self.config.reject_receipt_keyword else True),
-                bill_to_ok,
-            ]
+        all_checks_passed = (
+            amount_ok
+            and confidence_ok
+            and (is_invoice or not self.config.require_invoice_keyword)
+            and (not is_receipt or not self.config.reject_receipt_keyword)
+            and bill_to_ok
         )
 
-        if all_checks_passed:
+        return self._decision(all_checks_passed, reasons, checks, amount, confidence, vendor)
+
+    def _decision(
+        self,
+        approved: bool,
+        reasons: list[str],
+        checks: Dict[str, bool],
+        amount: float,
+        confidence: float,
+        vendor: str,
+    ) -> ApprovalDecision:
+        """Build and log the final decision"""
+        if approved:
             reason = f"Auto-approved: ${amount:.2f}, {confidence:.1%} confidence"
         else:
             reason = "Requires manual review: " + "; ".join(reasons)
 
-        logger.info(
-            "Invoice approval decision",
-            approved=all_checks_passed,
-            amount=amount,
-            confidence=confidence,
-            vendor=vendor,
-            checks=checks,
-        )
-
-        return ApprovalDecision(
-            approved=all_checks_passed,
+        decision = ApprovalDecision(
+            approved=approved,
             reason=reason,
             checks=checks,
             metadata={
                 "amount": amount,
                 "confidence": confidence,
                 "vendor": vendor,
-                "config": self.config.model_dump(),
+                "config": self._config_dump,
             },
         )
+        _log_decision(decision, cached=False)
+        return decision
+
+
+def _log_decision(decision: ApprovalDecision, cached: bool) -> None:
+    """Write the decision audit record (also for decisions served from cache)"""
+    logger.info(
+        "Invoice approval decision",
+        approved=decision.approved,
+        amount=decision.metadata["amount"],
+        confidence=decision.metadata["confidence"],
+        vendor=decision.metadata["vendor"],
+        checks=decision.checks,
+        cached=cached,
+    )
 
 
 def create_approval_rules(
@@ -311,15 +549,9 @@ def create_approval_rules(
     """
     from ..core.config import settings
 
-    # Parse comma-separated allowed_bill_to_names from settings if not provided
+    # Comma-separated APPROVAL_ALLOWED_BILL_TO_NAMES, already parsed by settings
     if allowed_bill_to_names is None:
-        bill_to_env = getattr(settings, "approval_allowed_bill_to_names", "")
-        if bill_to_env:
-            allowed_bill_to_names = [
-                name.strip() for name in bill_to_env.split(",") if name.strip()
-            ]
-        else:
-            allowed_bill_to_names = []
+        allowed_bill_to_names = list(settings.approval_allowed_bill_to_list)
 
     config = ApprovalRulesConfig(
         amount_threshold=(
@@ -346,3 +578,28 @@ def create_approval_rules(
     )
 
     return InvoiceApprovalRules(config)
+
+
+@lru_cache(maxsize=32)
+def _cached_approval_rules(allowed_bill_to_names: tuple[str, ...] | None) -> InvoiceApprovalRules:
+    return create_approval_rules(
+        allowed_bill_to_names=(
+            list(allowed_bill_to_names) if allowed_bill_to_names is not None else None
+        )
+    )
+
+
+def get_approval_rules(allowed_bill_to_names: list[str] | None = None) -> InvoiceApprovalRules:
+    """
+    Shared approval rules for the configured defaults and a bill-to whitelist.
+
+    Same semantics as ``create_approval_rules(allowed_bill_to_names=...)``, but
+    rule objects are built once per distinct whitelist and reused, so request
+    handlers don't re-read settings and rebuild the config on every call.
+
+    Settings are read when a whitelist is first seen; changing APPROVAL_*
+    environment variables requires a process restart (or reloading this
+    module) to take effect.
+    """
+    key = tuple(allowed_bill_to_names) if allowed_bill_to_names is not None else None
+    return _cached_approval_rules(key)
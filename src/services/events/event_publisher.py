@@ -8,10 +8,12 @@ Enables downstream systems to react to invoice processing:
 - Notification systems can alert stakeholders
 """
 
-import json
+import atexit
+import threading
+import orjson
 from datetime import datetime, UTC
 from typing import Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
 
 @dataclass
@@ -42,10 +44,23 @@ class InvoiceValidatedEvent:
         """
         Convert event to dictionary for JSON serialization.
 
+        Built explicitly rather than with ``dataclasses.asdict``, which
+        recursively deep-copies every field on each call.
+
         Returns:
             Dictionary representation suitable for Service Bus message body
         """
-        return asdict(self)
+        return {
+            "approval_id": self.approval_id,
+            "vendor": self.vendor,
+            "invoice_number": self.invoice_number,
+            "total": self.total,
+            "approved": self.approved,
+            "reason": self.reason,
+            "confidence": self.confidence,
+            "event_type": self.event_type,
+            "timestamp": self.timestamp,
+        }
 
     def to_json(self) -> str:
         """
@@ -54,7 +69,7 @@ class InvoiceValidatedEvent:
         Returns:
             JSON string representation
         """
-        return json.dumps(self.to_dict())
+        return orjson.dumps(self.to_dict()).decode()
 
 
 class EventPublisher:
@@ -74,10 +89,23 @@ class EventPublisher:
 
         # Disabled mode (no Service Bus configured)
         publisher = EventPublisher(service_bus_sender=None)
+
+        # High-volume: buffer up to 50 messages per send, flushing partial
+        # batches every 0.5s (and at interpreter exit)
+        publisher = EventPublisher(service_bus_sender=sender, batch_size=50)
+        ...
+        publisher.close()  # flush and release the exit hook
+
+    Batching is opt-in library API: the default publisher returned by
+    get_event_publisher() sends each event immediately.
     """
 
     def __init__(
-        self, service_bus_sender: Optional[object] = None, entity_name: str = "invoice-events"
+        self,
+        service_bus_sender: Optional[object] = None,
+        entity_name: str = "invoice-events",
+        batch_size: int = 1,
+        flush_interval: float = 0.5,
     ):
         """
         Initialize event publisher.
@@ -85,13 +113,26 @@ class EventPublisher:
         Args:
             service_bus_sender: Azure Service Bus sender (ServiceBusSender) or None to disable
             entity_name: Service Bus queue or topic name (default: invoice-events)
+            batch_size: Messages per send_messages call (default 1: send immediately)
+            flush_interval: Seconds before a partial batch is sent (batching only)
         """
         self.service_bus_sender = service_bus_sender
         self.entity_name = entity_name
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
 
         # For backward compatibility
         self.topic_name = entity_name
 
+        # ServiceBusSender is not thread-safe, and events are published from
+        # the request threadpool, so every send goes through _send_lock
+        self._send_lock = threading.Lock()
+        self._buffer: list = []
+        self._lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        if self.batch_size > 1 and service_bus_sender is not None:
+            atexit.register(self.flush)
+
     def publish_invoice_validated(self, event: InvoiceValidatedEvent) -> None:
         """
         Publish an invoice validated event to Service Bus.
@@ -110,8 +151,59 @@ class EventPublisher:
         from azure.servicebus import ServiceBusMessage
 
         message_body = event.to_json()
-        message = ServiceBusMessage(message_body, content_type="application/json")
-        self.service_bus_sender.send_messages(message)
+        # approval_id doubles as the message ID so duplicate detection on the
+        # queue/topic can drop re-published events
+        message = ServiceBusMessage(
+            message_body, content_type="application/json", message_id=event.approval_id
+        )
+        if self.batch_size == 1:
+            self._send(message)
+            return
+
+        with self._lock:
+            self._buffer.append(message)
+            if len(self._buffer) < self.batch_size:
+                self._schedule_flush()
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        """Send any buffered messages now (no-op when nothing is buffered)"""
+        # The send lock is taken before detaching the buffer so batches reach
+        # the sender in order; _lock is only held for the swap, so publishers
+        # can keep buffering while a send is in flight
+        with self._send_lock:
+            with self._lock:
+                batch = self._take_buffer()
+            if batch:
+                self.service_bus_sender.send_messages(batch)
+
+    def close(self) -> None:
+        """Flush buffered messages and drop the interpreter-exit flush hook"""
+        if self.service_bus_sender is None:
+            return
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _send(self, messages) -> None:
+        """Send one message or a list of messages, one sender call at a time"""
+        with self._send_lock:
+            self.service_bus_sender.send_messages(messages)
+
+    def _take_buffer(self) -> list:
+        """Detach the buffered messages and cancel the pending flush (lock held)"""
+        batch, self._buffer = self._buffer, []
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        return batch
+
+    def _schedule_flush(self) -> None:
+        """Arm the partial-batch flush timer if it isn't already (lock held)"""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
 
 
 # Singleton instance (optional - can also use dependency injection)
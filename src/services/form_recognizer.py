@@ -1,137 +1,285 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
+from threading import Lock
+from typing import TYPE_CHECKING, BinaryIO
 from loguru import logger
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.core.credentials import AzureKeyCredential
 from .invoice_types import ExtractedInvoice
 from ..core.config import settings
 
+if TYPE_CHECKING:
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
 
-def extract_invoice_fields(file_bytes: bytes) -> ExtractedInvoice:
-    # Check if Azure Document Intelligence is configured
-    if settings.az_di_endpoint and settings.az_di_api_key:
-        logger.info(
-            "Using Azure Document Intelligence for invoice extraction",
-            endpoint=(
-                settings.az_di_endpoint[:50] + "..."
-                if len(settings.az_di_endpoint) > 50
-                else settings.az_di_endpoint
-            ),
+
+@lru_cache(maxsize=4)
+def _get_di_client(endpoint: str, api_key: str) -> "DocumentIntelligenceClient":
+    """
+    Shared Document Intelligence client per endpoint/key.
+
+    The client owns an HTTP connection pool; reusing it keeps connections to
+    the DI endpoint alive across documents instead of re-handshaking TLS on
+    every extraction. Keyed on the credentials so rotated settings get a new
+    client.
+
+    The Azure SDK is imported here rather than at module load, so processes
+    that only use the mock path (tests, local dev) never pay its import cost.
+    """
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
+    from azure.core.credentials import AzureKeyCredential
+
+    return DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(api_key))
+
+
+@lru_cache(maxsize=4)
+def _endpoint_preview(endpoint: str) -> str:
+    """Endpoint shortened for logging (computed once per configured endpoint)"""
+    return endpoint[:50] + "..." if len(endpoint) > 50 else endpoint
+
+
+def _document_size(document: bytes | BinaryIO) -> int:
+    """Size in bytes of an in-memory or file-like document, without reading it"""
+    if isinstance(document, (bytes, bytearray)):
+        return len(document)
+    size = document.seek(0, 2)
+    document.seek(0)
+    return size
+
+
+# Extractions are cached by document digest, so re-uploads of the same file
+# (retries, duplicate submissions) don't pay for another Document Intelligence
+# call. Entries expire so model updates on the service side are picked up.
+_EXTRACTION_CACHE_SIZE = 256
+_EXTRACTION_CACHE_TTL_SECONDS = 60 * 60
+
+_extraction_cache: OrderedDict[str, tuple[float, ExtractedInvoice]] = OrderedDict()
+_extraction_cache_lock = Lock()
+
+
+def _new_digest(data: bytes = b"") -> hashlib.blake2b:
+    """128-bit blake2b hasher used for extraction cache keys"""
+    return hashlib.blake2b(data, digest_size=16)
+
+
+def _document_digest(document: bytes | BinaryIO) -> str:
+    """Content digest of an in-memory or file-like document (rewinds file objects)"""
+    if isinstance(document, (bytes, bytearray)):
+        return _new_digest(document).hexdigest()
+    document.seek(0)
+    # file_digest reads into one reusable buffer rather than a new bytes per chunk
+    digest = hashlib.file_digest(document, _new_digest).hexdigest()
+    document.seek(0)
+    return digest
+
+
+def _cached_extraction(digest: str) -> ExtractedInvoice | None:
+    with _extraction_cache_lock:
+        entry = _extraction_cache.get(digest)
+        if entry is None:
+            return None
+        stored_at, extracted = entry
+        if time.monotonic() - stored_at > _EXTRACTION_CACHE_TTL_SECONDS:
+            del _extraction_cache[digest]
+            return None
+        _extraction_cache.move_to_end(digest)
+    return extracted.model_copy()
+
+
+def _remember_extraction(digest: str, extracted: ExtractedInvoice) -> ExtractedInvoice:
+    with _extraction_cache_lock:
+        _extraction_cache[digest] = (time.monotonic(), extracted.model_copy())
+        _extraction_cache.move_to_end(digest)
+        if len(_extraction_cache) > _EXTRACTION_CACHE_SIZE:
+            _extraction_cache.popitem(last=False)
+    return extracted
+
+
+# Currency symbols, thousands separators and common currency codes stripped
+# from InvoiceTotal text before parsing, e.g. "$1,234.56", "USD 123.45"
+_TOTAL_NOISE_RE = re.compile(r"[$,]|USD|AUD|EUR|GBP|CAD|JPY|CNY")
+
+
+# prebuilt-invoice fields read by extract_invoice_fields, in unpacking order
+_INVOICE_FIELDS = (
+    "VendorName",
+    "InvoiceId",
+    "InvoiceDate",
+    "InvoiceTotal",
+    "CurrencyCode",
+    "CustomerName",
+    "BillingAddressRecipient",
+)
+
+
+def _field_text(fields, name: str) -> str | None:
+    """Text of a Document Intelligence field: its content, else its value"""
+    field = fields.get(name) if fields else None
+    if field is None:
+        return None
+    content = getattr(field, "content", None)
+    if content is not None:
+        return content
+    value = getattr(field, "value", None)
+    return str(value) if value is not None else None
+
+
+def _parse_invoice_total(total_field, total_text: str | None) -> float:
+    """
+    InvoiceTotal as a float.
+
+    Uses the typed currency amount Document Intelligence returns when present,
+    and only falls back to cleaning up the field's text otherwise.
+    """
+    amount = getattr(getattr(total_field, "value_currency", None), "amount", None)
+    if isinstance(amount, (int, float)):
+        return float(amount)
+
+    if not total_text:
+        return 0.0
+    try:
+        return float(_TOTAL_NOISE_RE.sub("", str(total_text)).strip())
+    except (ValueError, TypeError):
+        logger.warning(f"Could not parse invoice total: {total_text}")
+        return 0.0
+
+
+def _analyze_with_azure(document: bytes | BinaryIO, file_size: int) -> ExtractedInvoice:
+    """Run the prebuilt-invoice model on a document and map its fields"""
+    try:
+        client = _get_di_client(settings.az_di_endpoint, settings.az_di_api_key)
+
+        # Analyze the document using the prebuilt-invoice model
+        logger.info(f"Analyzing document of size {file_size} bytes")
+
+        # Always hand the SDK a stream so the request body is read in chunks;
+        # BytesIO over bytes shares the buffer rather than copying it
+        body = BytesIO(document) if isinstance(document, (bytes, bytearray)) else document
+        poller = client.begin_analyze_document(
+            "prebuilt-invoice", body=body, content_type="application/octet-stream"
         )
 
-        try:
-            # Initialize Azure Document Intelligence client
-            client = DocumentIntelligenceClient(
-                endpoint=settings.az_di_endpoint,
-                credential=AzureKeyCredential(settings.az_di_api_key),
+        result = poller.result()
+
+        # Extract full OCR content for validation
+        ocr_content = ""
+        if hasattr(result, "content") and result.content:
+            ocr_content = result.content
+
+        # Extract invoice fields from the first document
+        if result.documents and len(result.documents) > 0:
+            doc = result.documents[0]
+
+            # Access fields as attributes, not dictionary
+            fields = doc.fields if hasattr(doc, "fields") else {}
+
+            (
+                vendor_name,
+                invoice_id,
+                invoice_date,
+                invoice_total_raw,
+                currency,
+                customer_name,
+                billing_address_recipient,
+            ) = (_field_text(fields, name) for name in _INVOICE_FIELDS)
+            currency = currency or "USD"
+
+            # Bill-to: use whichever customer field is available
+            bill_to = customer_name or billing_address_recipient
+
+            # Parse total as float if possible
+            total_field = fields.get("InvoiceTotal") if fields else None
+            total_amount = _parse_invoice_total(total_field, invoice_total_raw)
+
+            # Calculate average confidence
+            confidence = doc.confidence if hasattr(doc, "confidence") else 0.0
+
+            logger.info(
+                "Successfully extracted invoice data from Azure DI",
+                vendor=vendor_name,
+                invoice_number=invoice_id,
+                confidence=confidence,
             )
 
-            # Analyze the document using the prebuilt-invoice model
-            logger.info(f"Analyzing document of size {len(file_bytes)} bytes")
+            return ExtractedInvoice(
+                vendor=vendor_name or "Unknown",
+                invoice_number=invoice_id or "N/A",
+                invoice_date=invoice_date or "N/A",
+                total=total_amount,
+                currency=currency,
+                confidence=confidence,
+                raw_chars=file_size,
+                content=ocr_content,
+                bill_to=bill_to,
+            )
+        else:
+            # No structured invoice data found - likely not an invoice document
+            # Still return OCR content so our intelligent classifier can analyze it
+            logger.warning(
+                "Azure DI prebuilt-invoice model found no structured invoice data. "
+                "Document may be a quote, receipt, or other non-invoice type. "
+                "Returning OCR content for intelligent classification."
+            )
 
-            poller = client.begin_analyze_document(
-                "prebuilt-invoice", body=file_bytes, content_type="application/octet-stream"
+            return ExtractedInvoice(
+                vendor="Unknown",
+                invoice_number="N/A",
+                invoice_date="N/A",
+                total=0.0,
+                currency="USD",
+                confidence=0.0,  # Low confidence since no structured data found
+                raw_chars=file_size,
+                content=ocr_content,
+                bill_to=None,
             )
 
-            result = poller.result()
-
-            # Extract full OCR content for validation
-            ocr_content = ""
-            if hasattr(result, "content") and result.content:
-                ocr_content = result.content
-
-            # Extract invoice fields from the first document
-            if result.documents and len(result.documents) > 0:
-                doc = result.documents[0]
-
-                # Access fields as attributes, not dictionary
-                fields = doc.fields if hasattr(doc, "fields") else {}
-
-                # Extract specific fields with proper attribute access
-                def get_field_content(field_name):
-                    if not fields or field_name not in fields:
-                        return None
-                    field = fields[field_name]
-                    if hasattr(field, "content"):
-                        return field.content
-                    elif hasattr(field, "value"):
-                        return str(field.value)
-                    return None
-
-                vendor_name = get_field_content("VendorName")
-                invoice_id = get_field_content("InvoiceId")
-                invoice_date = get_field_content("InvoiceDate")
-                invoice_total_raw = get_field_content("InvoiceTotal")
-                currency = get_field_content("CurrencyCode") or "USD"
-
-                # Extract customer/bill-to information
-                customer_name = get_field_content("CustomerName")
-                billing_address_recipient = get_field_content("BillingAddressRecipient")
-                # Use whichever is available
-                bill_to = customer_name or billing_address_recipient
-
-                # Parse total as float if possible
-                total_amount = 0.0
-                if invoice_total_raw:
-                    try:
-                        # Handle currency symbols, currency codes, and commas
-                        # Examples: "$123.45", "USD 123.45", "123.45", "1,234.56"
-                        total_str = str(invoice_total_raw)
-                        # Remove currency symbols and codes
-                        total_str = total_str.replace("$", "").replace(",", "")
-                        # Remove common currency codes (USD, AUD, EUR, GBP, etc.)
-                        for curr_code in ["USD", "AUD", "EUR", "GBP", "CAD", "JPY", "CNY"]:
-                            total_str = total_str.replace(curr_code, "")
-                        total_str = total_str.strip()
-                        total_amount = float(total_str)
-                    except (ValueError, TypeError):
-                        logger.warning(f"Could not parse invoice total: {invoice_total_raw}")
-                        total_amount = 0.0
-
-                # Calculate average confidence
-                confidence = doc.confidence if hasattr(doc, "confidence") else 0.0
-
-                logger.info(
-                    "Successfully extracted invoice data from Azure DI",
-                    vendor=vendor_name,
-                    invoice_number=invoice_id,
-                    confidence=confidence,
-                )
-
-                return ExtractedInvoice(
-                    vendor=vendor_name or "Unknown",
-                    invoice_number=invoice_id or "N/A",
-                    invoice_date=invoice_date or "N/A",
-                    total=total_amount,
-                    currency=currency,
-                    confidence=confidence,
-                    raw_chars=len(file_bytes),
-                    content=ocr_content,
-                    bill_to=bill_to,
-                )
-            else:
-                # No structured invoice data found - likely not an invoice document
-                # Still return OCR content so our intelligent classifier can analyze it
-                logger.warning(
-                    "Azure DI prebuilt-invoice model found no structured invoice data. "
-                    "Document may be a quote, receipt, or other non-invoice type. "
-                    "Returning OCR content for intelligent classification."
-                )
-
-                return ExtractedInvoice(
-                    vendor="Unknown",
-                    invoice_number="N/A",
-                    invoice_date="N/A",
-                    total=0.0,
-                    currency="USD",
-                    confidence=0.0,  # Low confidence since no structured data found
-                    raw_chars=len(file_bytes),
-                    content=ocr_content,
-                    bill_to=None,
-                )
-
-        except Exception as e:
-            logger.error(f"Azure DI extraction failed: {str(e)}")
-            raise Exception(f"Invoice extraction failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Azure DI extraction failed: {str(e)}")
+        raise Exception(f"Invoice extraction failed: {str(e)}")
+
+
+def extract_invoice_fields(
+    document: bytes | BinaryIO, cache: bool = True, size_hint: int | None = None
+) -> ExtractedInvoice:
+    """
+    Extract invoice fields from a PDF/image document.
+
+    Accepts raw bytes or a seekable binary file object (e.g. the spooled
+    temporary file behind an UploadFile), so large uploads can be handed to
+    the Azure SDK without first being copied into a single bytes object.
+
+    Pass ``cache=False`` to force a fresh Document Intelligence analysis and
+    keep the result out of the extraction cache (e.g. for sensitive
+    documents that shouldn't be retained in memory).
+
+    ``size_hint`` is the document size when the caller already knows it
+    (e.g. ``UploadFile.size``), which saves seeking to the end of the stream.
+    """
+    if size_hint is not None:
+        file_size = size_hint
+    else:
+        file_size = _document_size(document) if document is not None else 0
+
+    # Check if Azure Document Intelligence is configured
+    endpoint, api_key = settings.az_di_endpoint, settings.az_di_api_key
+    if endpoint and api_key:
+        logger.info(
+            "Using Azure Document Intelligence for invoice extraction",
+            endpoint=_endpoint_preview(endpoint),
+        )
+
+        if not cache:
+            return _analyze_with_azure(document, file_size)
+
+        digest = _document_digest(document)
+        cached = _cached_extraction(digest)
+        if cached is not None:
+            logger.info("Returning cached extraction for identical document", digest=digest)
+            return cached
+
+        return _remember_extraction(digest, _analyze_with_azure(document, file_size))
 
     else:
         logger.warning(
@@ -140,7 +288,7 @@ def extract_invoice_fields(file_bytes: bytes) -> ExtractedInvoice:
         )
 
         # Mock extraction for demo
-        text_len = len(file_bytes or b"")
+        text_len = file_size
         conf = 0.92 if text_len > 0 else 0.0
 
         logger.info("Returning mock invoice extraction", file_size_bytes=text_len, confidence=conf)
@@ -156,3 +304,16 @@ def extract_invoice_fields(file_bytes: bytes) -> ExtractedInvoice:
             content="INVOICE\nContoso Pty Ltd\nInvoice #: INV-10023\nTotal: AUD 385.00\nDue Date: 2025-10-15",
             bill_to="Ammons DataLabs",
         )
+
+
+async def extract_invoice_fields_async(
+    document: bytes | BinaryIO, cache: bool = True, size_hint: int | None = None
+) -> ExtractedInvoice:
+    """
+    Awaitable ``extract_invoice_fields`` for async callers.
+
+    Runs the blocking SDK call in a worker thread so the event loop stays free
+    while Document Intelligence analyzes the document, and so several
+    documents can be extracted concurrently with ``asyncio.gather``.
+    """
+    return await asyncio.to_thread(extract_invoice_fields, document, cache, size_hint)
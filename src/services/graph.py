@@ -1,44 +1,74 @@
-import json
 import httpx
+import orjson
 from ..core.config import settings
 
 # Lightweight demo approval: post an Adaptive Card to a Teams Incoming Webhook.
 # In production, consider Graph APIs or Dataverse Approvals.
 
-ADAPTIVE_CARD_TEMPLATE = {
-    "type": "message",
-    "attachments": [
-        {
-            "contentType": "application/vnd.microsoft.card.adaptive",
-            "content": {
-                "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-                "type": "AdaptiveCard",
-                "version": "1.4",
-                "body": [
-                    {
-                        "type": "TextBlock",
-                        "weight": "Bolder",
-                        "size": "Medium",
-                        "text": "Invoice Approval",
-                    },
-                    {"type": "FactSet", "facts": []},
-                ],
-                "actions": [
-                    {
-                        "type": "Action.OpenUrl",
-                        "title": "Approve",
-                        "url": "https://example.com/approve",
-                    },
-                    {
-                        "type": "Action.OpenUrl",
-                        "title": "Reject",
-                        "url": "https://example.com/reject",
-                    },
-                ],
-            },
-        }
-    ],
-}
+# Invoice fields shown on the card, in display order
+CARD_FACT_KEYS = ("vendor", "invoice_number", "invoice_date", "total", "currency", "confidence")
+
+
+def _build_card(facts: list[dict], approve_url: str, reject_url: str) -> dict:
+    """Adaptive Card message with the given facts and approve/reject buttons"""
+    return {
+        "type": "message",
+        "attachments": [
+            {
+                "contentType": "application/vnd.microsoft.card.adaptive",
+                "content": {
+                    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+                    "type": "AdaptiveCard",
+                    "version": "1.4",
+                    "body": [
+                        {
+                            "type": "TextBlock",
+                            "weight": "Bolder",
+                            "size": "Medium",
+                            "text": "Invoice Approval",
+                        },
+                        {"type": "FactSet", "facts": facts},
+                    ],
+                    "actions": [
+                        {"type": "Action.OpenUrl", "title": "Approve", "url": approve_url},
+                        {"type": "Action.OpenUrl", "title": "Reject", "url": reject_url},
+                    ],
+                },
+            }
+        ],
+    }
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+# Shared client so repeated card posts reuse the keep-alive connection to the
+# webhook host instead of paying a TCP + TLS handshake each time.
+# Opened on application startup and closed on shutdown (see api.main); created
+# on first use if the app lifespan hasn't run (e.g. scripts, tests).
+_client: httpx.AsyncClient | None = None
+
+_CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=10, limits=_CLIENT_LIMITS)
+    return _client
+
+
+async def init_http_client() -> None:
+    """Open the shared webhook client (called on application startup)"""
+    _get_client()
+
+
+async def close_http_client() -> None:
+    """Close the shared webhook client (called on application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
 async def post_approval_card(fields: dict, approval_id: str) -> dict:
@@ -48,26 +78,13 @@ async def post_approval_card(fields: dict, approval_id: str) -> dict:
     # Use configured API base URL (supports both local and deployed environments)
     base_url = settings.api_base_url
 
-    card = json.loads(json.dumps(ADAPTIVE_CARD_TEMPLATE))
-    facts = card["attachments"][0]["content"]["body"][1]["facts"]
-    for k in ["vendor", "invoice_number", "invoice_date", "total", "currency", "confidence"]:
-        if k in fields and fields[k] is not None:
-            facts.append({"title": k, "value": str(fields[k])})
-
-    # Update the action buttons with actual approval URLs
-    card["attachments"][0]["content"]["actions"] = [
-        {
-            "type": "Action.OpenUrl",
-            "title": "Approve",
-            "url": f"{base_url}/invoices/approval/{approval_id}/approve",
-        },
-        {
-            "type": "Action.OpenUrl",
-            "title": "Reject",
-            "url": f"{base_url}/invoices/approval/{approval_id}/reject",
-        },
+    facts = [
+        {"title": k, "value": str(v)} for k in CARD_FACT_KEYS if (v := fields.get(k)) is not None
     ]
+    approvals_url = f"{base_url}/invoices/approval/{approval_id}"
+    card = _build_card(facts, f"{approvals_url}/approve", f"{approvals_url}/reject")
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(settings.teams_webhook_url, json=card)
-        return {"status": "sent", "http_status": r.status_code}
+    r = await _get_client().post(
+        settings.teams_webhook_url, content=orjson.dumps(card), headers=_JSON_HEADERS
+    )
+    return {"status": "sent", "http_status": r.status_code}
@@ -33,6 +33,19 @@ class ApprovalTrackerBase(ABC):
         """
         pass
 
+    @abstractmethod
+    def create_many(self, invoice_list: list[dict]) -> list[str]:
+        """
+        Create approval requests for a batch of invoices.
+
+        Args:
+            invoice_list: List of dictionaries containing invoice details
+
+        Returns:
+            Approval IDs, in the same order as invoice_list
+        """
+        pass
+
     @abstractmethod
     def get_approval(self, approval_id: str) -> Optional[dict]:
         """
@@ -90,3 +103,46 @@ class ApprovalTrackerBase(ABC):
             List of approval dictionaries (same format as get_approval)
         """
         pass
+
+    @abstractmethod
+    def list_approved(self, limit: Optional[int] = None, offset: int = 0) -> list:
+        """
+        List approved approvals, most recently decided first.
+
+        Args:
+            limit: Maximum number of approvals to return (None for all)
+            offset: Number of approvals to skip from the newest end
+
+        Returns:
+            List of approval dictionaries (same format as get_approval)
+        """
+        pass
+
+    @abstractmethod
+    def count_approved(self) -> int:
+        """
+        Count approved approvals.
+
+        Returns:
+            Number of approvals with status 'approved'
+        """
+        pass
+
+    @abstractmethod
+    def list_approved_with_count(
+        self, limit: Optional[int] = None, offset: int = 0
+    ) -> tuple[list, int]:
+        """
+        List a page of approved approvals together with the total count.
+
+        The page and the count come from one consistent read, so the total
+        always agrees with the page served alongside it.
+
+        Args:
+            limit: Maximum number of approvals to return (None for all)
+            offset: Number of approvals to skip from the newest end
+
+        Returns:
+            Tuple of (approval dictionaries, number of approved approvals)
+        """
+        pass
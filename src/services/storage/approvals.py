@@ -3,56 +3,139 @@ In-memory approval tracking (for demo purposes).
 In production, use a database (SQL, Cosmos DB, etc.)
 """
 
+from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
+from threading import Lock
 from typing import Dict, Optional
-import uuid
+from secrets import token_hex
 from .approval_tracker_base import ApprovalTrackerBase
 
 
+@dataclass(slots=True)
+class ApprovalRecord:
+    """Stored approval; slotted so each record is smaller than a dict"""
+
+    id: str
+    invoice_data: dict
+    created_at: str
+    status: str = "pending"
+    decided_at: Optional[str] = None
+    decided_by: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Approval dictionary in the ApprovalTrackerBase format"""
+        return {
+            "id": self.id,
+            "invoice_data": self.invoice_data,
+            "status": self.status,
+            "created_at": self.created_at,
+            "decided_at": self.decided_at,
+            "decided_by": self.decided_by,
+        }
+
+
 class ApprovalTracker(ApprovalTrackerBase):
     def __init__(self):
-        self._approvals: Dict[str, dict] = {}
+        self._approvals: Dict[str, ApprovalRecord] = {}
+        # Approved IDs in approval order (dict as an ordered set), so the
+        # approved listing never has to scan and sort every approval
+        self._approved_ids: Dict[str, None] = {}
+        # Guards both dicts and the records in them: writers update several
+        # fields at once, and readers iterate, which fails if another thread
+        # resizes a dict mid-iteration
+        self._lock = Lock()
 
     def create_approval(self, invoice_data: dict) -> str:
         """Create a new approval request and return the approval ID"""
-        approval_id = str(uuid.uuid4())
-        self._approvals[approval_id] = {
-            "id": approval_id,
-            "invoice_data": invoice_data,
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat(),
-            "decided_at": None,
-            "decided_by": None,
-        }
+        approval_id = token_hex(16)
+        record = ApprovalRecord(
+            id=approval_id,
+            invoice_data=invoice_data,
+            created_at=datetime.utcnow().isoformat(),
+        )
+        with self._lock:
+            self._approvals[approval_id] = record
         return approval_id
 
+    def create_many(self, invoice_list: list[dict]) -> list[str]:
+        """Create approval requests for a batch of invoices, returning IDs in order"""
+        created_at = datetime.utcnow().isoformat()
+        records = [
+            ApprovalRecord(id=token_hex(16), invoice_data=invoice_data, created_at=created_at)
+            for invoice_data in invoice_list
+        ]
+        with self._lock:
+            self._approvals.update((record.id, record) for record in records)
+        return [record.id for record in records]
+
     def get_approval(self, approval_id: str) -> Optional[dict]:
         """Get approval details by ID"""
-        return self._approvals.get(approval_id)
+        with self._lock:
+            approval = self._approvals.get(approval_id)
+            return approval.to_dict() if approval is not None else None
 
     def approve(self, approval_id: str, approver: str = "user") -> bool:
         """Mark an approval as approved"""
-        if approval_id not in self._approvals:
-            return False
+        with self._lock:
+            approval = self._approvals.get(approval_id)
+            if approval is None:
+                return False
 
-        self._approvals[approval_id]["status"] = "approved"
-        self._approvals[approval_id]["decided_at"] = datetime.utcnow().isoformat()
-        self._approvals[approval_id]["decided_by"] = approver
+            # Re-approval moves the record to the newest position
+            self._approved_ids.pop(approval_id, None)
+            approval.status = "approved"
+            approval.decided_at = datetime.utcnow().isoformat()
+            approval.decided_by = approver
+            self._approved_ids[approval_id] = None
         return True
 
     def reject(self, approval_id: str, rejector: str = "user") -> bool:
         """Mark an approval as rejected"""
-        if approval_id not in self._approvals:
-            return False
+        with self._lock:
+            approval = self._approvals.get(approval_id)
+            if approval is None:
+                return False
 
-        self._approvals[approval_id]["status"] = "rejected"
-        self._approvals[approval_id]["decided_at"] = datetime.utcnow().isoformat()
-        self._approvals[approval_id]["decided_by"] = rejector
+            self._approved_ids.pop(approval_id, None)
+            approval.status = "rejected"
+            approval.decided_at = datetime.utcnow().isoformat()
+            approval.decided_by = rejector
         return True
 
     def list_all(self) -> list:
         """List all approvals (for debugging)"""
-        return list(self._approvals.values())
+        with self._lock:
+            return [approval.to_dict() for approval in self._approvals.values()]
+
+    def list_approved(self, limit: Optional[int] = None, offset: int = 0) -> list:
+        """List approved approvals, most recently decided first"""
+        with self._lock:
+            return self._approved_page(limit, offset)
+
+    def count_approved(self) -> int:
+        """Count approved approvals"""
+        with self._lock:
+            return len(self._approved_ids)
+
+    def list_approved_with_count(
+        self, limit: Optional[int] = None, offset: int = 0
+    ) -> tuple[list, int]:
+        """A page of approved approvals plus the total, read under one lock"""
+        with self._lock:
+            return self._approved_page(limit, offset), len(self._approved_ids)
+
+    def _approved_page(self, limit: Optional[int], offset: int) -> list:
+        """Approved approvals, newest first, sliced to the page (lock held)"""
+        stop = None if limit is None else offset + limit
+        page = islice(reversed(self._approved_ids), offset, stop)
+        return [self._approvals[approval_id].to_dict() for approval_id in page]
+
+    def clear(self) -> None:
+        """Remove all approvals (used by tests and demo resets)"""
+        with self._lock:
+            self._approvals.clear()
+            self._approved_ids.clear()
 
 
 # Global instance (in production, use dependency injection)
@@ -5,14 +5,48 @@ Provides persistent storage of invoice approvals with SQL query capabilities.
 """
 
 import sqlite3
-import json
-import uuid
+import orjson
+import threading
+import weakref
+from secrets import token_hex
 from datetime import datetime, UTC
 from typing import Optional
 from pathlib import Path
 from .approval_tracker_base import ApprovalTrackerBase
 
 
+class _ConnectionHolder:
+    """Owns one thread's connection; closing it once the thread's locals are freed"""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _utcnow_iso() -> str:
+    """Current UTC time as an ISO 8601 string"""
+    return datetime.now(UTC).isoformat()
+
+
+def _invoice_data_column(include_invoice_data: bool) -> str:
+    """SELECT expression for invoice_data, or a NULL placeholder to skip it"""
+    return "invoice_data" if include_invoice_data else "NULL AS invoice_data"
+
+
+def _row_to_approval(row: sqlite3.Row) -> dict:
+    """Convert an approvals row to the tracker's dictionary format"""
+    invoice_data = row["invoice_data"]
+    return {
+        "id": row["id"],
+        "invoice_data": orjson.loads(invoice_data) if invoice_data is not None else None,
+        "status": row["status"],
+        "created_at": row["created_at"],
+        "decided_at": row["decided_at"],
+        "decided_by": row["decided_by"],
+    }
+
+
 class SQLiteApprovalTracker(ApprovalTrackerBase):
     """
     SQLite-backed approval tracker with persistent storage.
@@ -22,6 +56,8 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
     - SQL queries for business intelligence
     - Status-based filtering
     - Thread-safe operations (via SQLite's built-in locking)
+    - One persistent connection per thread, in WAL mode so reads don't block
+      behind writes; a thread's connection is closed when the thread exits
     """
 
     def __init__(self, db_path: str = "approvals.db"):
@@ -32,11 +68,15 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
             db_path: Path to SQLite database file (default: approvals.db)
         """
         self.db_path = db_path
+        self._local = threading.local()
+        # Live per-thread connections, held weakly so dead threads drop out
+        self._connections: weakref.WeakSet[_ConnectionHolder] = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
         self._init_database()
 
     def _init_database(self):
         """Create approvals table if it doesn't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -68,14 +108,49 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
         """
         )
 
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_status_decided_at
+            ON approvals(status, decided_at)
+        """
+        )
+
         conn.commit()
-        conn.close()
 
     def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """
+        Get this thread's database connection, opening it on first use.
+
+        Connections are kept open for the tracker's lifetime instead of being
+        opened and closed per call, which saves the file open, locking and
+        journal setup on every operation.
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            holder = _ConnectionHolder(conn)
+            # Worker threads come and go (the threadpool retires idle ones);
+            # when a thread exits its locals are freed, and this closes its
+            # connection rather than leaking the fd, page cache and WAL reader
+            weakref.finalize(holder, conn.close)
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.add(holder)
+        return holder.conn
+
+    def close(self) -> None:
+        """Close every connection opened by this tracker"""
+        with self._connections_lock:
+            holders = list(self._connections)
+            self._connections.clear()
+        for holder in holders:
+            holder.conn.close()
+        self._local = threading.local()
 
     def create_approval(self, invoice_data: dict) -> str:
         """
@@ -85,27 +160,54 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
             invoice_data: Dictionary containing invoice details
 
         Returns:
-            Approval ID (UUID string)
+            Approval ID (32-character random hex string)
         """
-        approval_id = str(uuid.uuid4())
-        created_at = datetime.now(UTC).isoformat()
+        approval_id = token_hex(16)
+        created_at = _utcnow_iso()
 
         conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO approvals (id, invoice_data, status, created_at)
-            VALUES (?, ?, 'pending', ?)
-        """,
-            (approval_id, json.dumps(invoice_data), created_at),
-        )
 
-        conn.commit()
-        conn.close()
+        # The connection outlives this call, so a failed write must roll back
+        # rather than leave its transaction open for the thread's next call
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO approvals (id, invoice_data, status, created_at)
+                VALUES (?, ?, 'pending', ?)
+            """,
+                (approval_id, orjson.dumps(invoice_data).decode(), created_at),
+            )
 
         return approval_id
 
+    def create_many(self, invoice_list: list[dict]) -> list[str]:
+        """
+        Create approval requests for a batch of invoices in one transaction.
+
+        Args:
+            invoice_list: List of dictionaries containing invoice details
+
+        Returns:
+            Approval IDs, in the same order as invoice_list
+        """
+        created_at = _utcnow_iso()
+        rows = [
+            (token_hex(16), orjson.dumps(invoice_data).decode(), created_at)
+            for invoice_data in invoice_list
+        ]
+
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO approvals (id, invoice_data, status, created_at)
+                VALUES (?, ?, 'pending', ?)
+            """,
+                rows,
+            )
+
+        return [row[0] for row in rows]
+
     def get_approval(self, approval_id: str) -> Optional[dict]:
         """
         Get approval details by ID.
@@ -129,19 +231,11 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
         )
 
         row = cursor.fetchone()
-        conn.close()
 
         if row is None:
             return None
 
-        return {
-            "id": row["id"],
-            "invoice_data": json.loads(row["invoice_data"]),
-            "status": row["status"],
-            "created_at": row["created_at"],
-            "decided_at": row["decided_at"],
-            "decided_by": row["decided_by"],
-        }
+        return _row_to_approval(row)
 
     def approve(self, approval_id: str, approver: str = "user") -> bool:
         """
@@ -155,26 +249,22 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
             True if successful, False if approval not found
         """
         conn = self._get_connection()
-        cursor = conn.cursor()
 
-        decided_at = datetime.now(UTC).isoformat()
-
-        cursor.execute(
-            """
-            UPDATE approvals
-            SET status = 'approved',
-                decided_at = ?,
-                decided_by = ?
-            WHERE id = ?
-        """,
-            (decided_at, approver, approval_id),
-        )
-
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        decided_at = _utcnow_iso()
+
+        with conn:
+            cursor = conn.execute(
+                """
+                UPDATE approvals
+                SET status = 'approved',
+                    decided_at = ?,
+                    decided_by = ?
+                WHERE id = ?
+            """,
+                (decided_at, approver, approval_id),
+            )
 
-        return rows_affected > 0
+        return cursor.rowcount > 0
 
     def reject(self, approval_id: str, rejector: str = "user") -> bool:
         """
@@ -188,31 +278,32 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
             True if successful, False if approval not found
         """
         conn = self._get_connection()
-        cursor = conn.cursor()
 
-        decided_at = datetime.now(UTC).isoformat()
-
-        cursor.execute(
-            """
-            UPDATE approvals
-            SET status = 'rejected',
-                decided_at = ?,
-                decided_by = ?
-            WHERE id = ?
-        """,
-            (decided_at, rejector, approval_id),
-        )
-
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        decided_at = _utcnow_iso()
+
+        with conn:
+            cursor = conn.execute(
+                """
+                UPDATE approvals
+                SET status = 'rejected',
+                    decided_at = ?,
+                    decided_by = ?
+                WHERE id = ?
+            """,
+                (decided_at, rejector, approval_id),
+            )
 
-        return rows_affected > 0
+        return cursor.rowcount > 0
 
-    def list_all(self) -> list:
+    def list_all(self, include_invoice_data: bool = True) -> list:
         """
         List all approvals (ordered by creation time, newest first).
 
+        Args:
+            include_invoice_data: Set False when only status and timestamps
+                are needed; invoice_data is then None and the stored JSON is
+                neither fetched nor decoded
+
         Returns:
             List of approval dictionaries
         """
@@ -220,34 +311,26 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
         cursor = conn.cursor()
 
         cursor.execute(
-            """
-            SELECT id, invoice_data, status, created_at, decided_at, decided_by
+            f"""
+            SELECT id, {_invoice_data_column(include_invoice_data)},
+                   status, created_at, decided_at, decided_by
             FROM approvals
             ORDER BY created_at DESC
         """
         )
 
         rows = cursor.fetchall()
-        conn.close()
-
-        return [
-            {
-                "id": row["id"],
-                "invoice_data": json.loads(row["invoice_data"]),
-                "status": row["status"],
-                "created_at": row["created_at"],
-                "decided_at": row["decided_at"],
-                "decided_by": row["decided_by"],
-            }
-            for row in rows
-        ]
 
-    def query_by_status(self, status: str) -> list:
+        return [_row_to_approval(row) for row in rows]
+
+    def query_by_status(self, status: str, include_invoice_data: bool = True) -> list:
         """
         Query approvals by status.
 
         Args:
             status: One of 'pending', 'approved', 'rejected'
+            include_invoice_data: Set False to skip fetching and decoding
+                invoice_data (see list_all)
 
         Returns:
             List of approval dictionaries matching the status
@@ -256,8 +339,9 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
         cursor = conn.cursor()
 
         cursor.execute(
-            """
-            SELECT id, invoice_data, status, created_at, decided_at, decided_by
+            f"""
+            SELECT id, {_invoice_data_column(include_invoice_data)},
+                   status, created_at, decided_at, decided_by
             FROM approvals
             WHERE status = ?
             ORDER BY created_at DESC
@@ -266,25 +350,111 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
         )
 
         rows = cursor.fetchall()
-        conn.close()
-
-        return [
-            {
-                "id": row["id"],
-                "invoice_data": json.loads(row["invoice_data"]),
-                "status": row["status"],
-                "created_at": row["created_at"],
-                "decided_at": row["decided_at"],
-                "decided_by": row["decided_by"],
-            }
-            for row in rows
-        ]
+
+        return [_row_to_approval(row) for row in rows]
+
+    def total_by_status(self, status: str) -> float:
+        """
+        Sum invoice totals for a status entirely inside SQLite (JSON1).
+
+        Intended for dashboards, which need the figure but not the rows.
+
+        Args:
+            status: One of 'pending', 'approved', 'rejected'
+
+        Returns:
+            Sum of invoice_data.total over matching approvals (0.0 if none)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT TOTAL(CAST(json_extract(invoice_data, '$.total') AS REAL))
+            FROM approvals
+            WHERE status = ?
+        """,
+            (status,),
+        )
+
+        return cursor.fetchone()[0]
+
+    def list_approved(self, limit: Optional[int] = None, offset: int = 0) -> list:
+        """
+        List approved approvals, most recently decided first.
+
+        Args:
+            limit: Maximum number of approvals to return (None for all)
+            offset: Number of approvals to skip from the newest end
+
+        Returns:
+            List of approval dictionaries
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        # LIMIT -1 means no limit in SQLite
+        cursor.execute(
+            """
+            SELECT id, invoice_data, status, created_at, decided_at, decided_by
+            FROM approvals
+            WHERE status = 'approved'
+            ORDER BY decided_at DESC
+            LIMIT ? OFFSET ?
+        """,
+            (-1 if limit is None else limit, offset),
+        )
+
+        rows = cursor.fetchall()
+
+        return [_row_to_approval(row) for row in rows]
+
+    def count_approved(self) -> int:
+        """
+        Count approved approvals.
+
+        Returns:
+            Number of approvals with status 'approved'
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT COUNT(*) FROM approvals WHERE status = 'approved'")
+        count = cursor.fetchone()[0]
+
+        return count
+
+    def list_approved_with_count(
+        self, limit: Optional[int] = None, offset: int = 0
+    ) -> tuple[list, int]:
+        """
+        List a page of approved approvals together with the total count.
+
+        Both queries run in one read transaction, so the count matches the
+        snapshot the page was read from even while other threads write.
+
+        Args:
+            limit: Maximum number of approvals to return (None for all)
+            offset: Number of approvals to skip from the newest end
+
+        Returns:
+            Tuple of (approval dictionaries, number of approved approvals)
+        """
+        conn = self._get_connection()
+        with conn:
+            conn.execute("BEGIN")
+            approvals = self.list_approved(limit, offset)
+            count = self.count_approved()
+
+        return approvals, count
 
     def query_pending_over_threshold(self, amount_threshold: float) -> list:
         """
         Query pending approvals over a given amount threshold.
 
-        Useful for identifying high-value invoices awaiting approval.
+        Useful for identifying high-value invoices awaiting approval. The
+        amount filter runs inside SQLite (JSON1), so only matching rows are
+        fetched and decoded.
 
         Args:
             amount_threshold: Minimum invoice amount to filter by
@@ -295,35 +465,21 @@ class SQLiteApprovalTracker(ApprovalTrackerBase):
         conn = self._get_connection()
         cursor = conn.cursor()
 
+        # Missing totals count as 0, as with invoice_data.get("total", 0)
         cursor.execute(
             """
             SELECT id, invoice_data, status, created_at, decided_at, decided_by
             FROM approvals
             WHERE status = 'pending'
+              AND CAST(COALESCE(json_extract(invoice_data, '$.total'), 0) AS REAL) > ?
             ORDER BY created_at DESC
-        """
+        """,
+            (amount_threshold,),
         )
 
         rows = cursor.fetchall()
-        conn.close()
-
-        # Filter by amount (invoice_data is JSON)
-        results = []
-        for row in rows:
-            invoice_data = json.loads(row["invoice_data"])
-            if invoice_data.get("total", 0) > amount_threshold:
-                results.append(
-                    {
-                        "id": row["id"],
-                        "invoice_data": invoice_data,
-                        "status": row["status"],
-                        "created_at": row["created_at"],
-                        "decided_at": row["decided_at"],
-                        "decided_by": row["decided_by"],
-                    }
-                )
-
-        return results
+
+        return [_row_to_approval(row) for row in rows]
 
 
 # Singleton instance for production use
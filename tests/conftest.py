@@ -1,10 +1,17 @@
 """
 Pytest configuration for integration tests.
 
-This file registers custom pytest markers and command-line options.
+This file registers custom pytest markers and command-line options, and
+provides the shared API client and approval-state isolation fixtures.
 """
 
+import httpx
 import pytest
+import respx
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.core.config import settings
+from src.services.storage import approval_tracker
 
 
 def pytest_addoption(parser):
@@ -33,3 +40,27 @@ def pytest_collection_modifyitems(config, items):
     for item in items:
         if "integration" in item.keywords:
             item.add_marker(skip_integration)
+
+
+@pytest.fixture(scope="module")
+def client():
+    """TestClient shared by a test module; app startup/shutdown runs once"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def mock_webhook():
+    """Teams webhook stub (https://example.com/webhook) shared by a test module"""
+    with respx.mock(assert_all_called=False) as router:
+        router.post("https://example.com/webhook").mock(return_value=httpx.Response(200))
+        yield router
+
+
+@pytest.fixture(autouse=True)
+def isolate_approval_state(monkeypatch):
+    """Start each test with no approvals and restore the Teams webhook afterwards"""
+    monkeypatch.setattr(settings, "teams_webhook_url", settings.teams_webhook_url)
+    approval_tracker.clear()
+    yield
+    approval_tracker.clear()
@@ -1,114 +1,95 @@
-from fastapi.testclient import TestClient
-from src.api.main import app
+import threading
 from src.core.config import settings
 from src.services.storage import approval_tracker
-import respx
-import httpx
+from src.services.storage.approvals import ApprovalTracker
 
-client = TestClient(app)
 
-
-def test_approval_workflow_end_to_end():
+def test_approval_workflow_end_to_end(client, mock_webhook):
     """Test complete approval workflow"""
     # Set webhook for test
     settings.teams_webhook_url = "https://example.com/webhook"
 
-    # Clear any existing approvals
-    approval_tracker._approvals.clear()
-
-    with respx.mock:
-        respx.post("https://example.com/webhook").mock(return_value=httpx.Response(200))
-
-        # Step 1: Request approval
-        payload = {
-            "vendor": "Test Corp",
-            "invoice_number": "INV-999",
-            "invoice_date": "2025-10-21",
-            "total": 250.50,
-            "currency": "USD",
-            "confidence": 0.98,
-        }
-        r = client.post("/invoices/request-approval", json=payload)
-        assert r.status_code == 200
-        assert "approval_id" in r.json()
-        approval_id = r.json()["approval_id"]
-
-        # Step 2: Check approval was created
-        r = client.get("/invoices/approvals")
-        assert r.status_code == 200
-        approvals = r.json()["approvals"]
-        assert len(approvals) == 1
-        assert approvals[0]["status"] == "pending"
-        assert approvals[0]["invoice_data"]["vendor"] == "Test Corp"
-
-        # Step 3: Approve the invoice
-        r = client.get(f"/invoices/approval/{approval_id}/approve")
-        assert r.status_code == 200
-        assert "Invoice Approved" in r.text
-
-        # Step 4: Verify approval was recorded
-        r = client.get("/invoices/approvals")
-        approvals = r.json()["approvals"]
-        assert approvals[0]["status"] == "approved"
-        assert approvals[0]["decided_by"] == "user"
-
-
-def test_reject_workflow():
+    # Step 1: Request approval
+    payload = {
+        "vendor": "Test Corp",
+        "invoice_number": "INV-999",
+        "invoice_date": "2025-10-21",
+        "total": 250.50,
+        "currency": "USD",
+        "confidence": 0.98,
+    }
+    r = client.post("/invoices/request-approval", json=payload)
+    assert r.status_code == 200
+    assert "approval_id" in r.json()
+    approval_id = r.json()["approval_id"]
+
+    # Step 2: Check approval was created
+    r = client.get("/invoices/approvals")
+    assert r.status_code == 200
+    approvals = r.json()["approvals"]
+    assert len(approvals) == 1
+    assert approvals[0]["status"] == "pending"
+    assert approvals[0]["invoice_data"]["vendor"] == "Test Corp"
+
+    # Step 3: Approve the invoice
+    r = client.get(f"/invoices/approval/{approval_id}/approve")
+    assert r.status_code == 200
+    assert "Invoice Approved" in r.text
+
+    # Step 4: Verify approval was recorded
+    r = client.get("/invoices/approvals")
+    approvals = r.json()["approvals"]
+    assert approvals[0]["status"] == "approved"
+    assert approvals[0]["decided_by"] == "user"
+
+
+def test_reject_workflow(client, mock_webhook):
     """Test rejection workflow"""
     settings.teams_webhook_url = "https://example.com/webhook"
-    approval_tracker._approvals.clear()
-
-    with respx.mock:
-        respx.post("https://example.com/webhook").mock(return_value=httpx.Response(200))
 
-        # Create approval
-        payload = {"vendor": "Reject Corp", "total": 100.0}
-        r = client.post("/invoices/request-approval", json=payload)
-        approval_id = r.json()["approval_id"]
+    # Create approval
+    payload = {"vendor": "Reject Corp", "total": 100.0}
+    r = client.post("/invoices/request-approval", json=payload)
+    approval_id = r.json()["approval_id"]
 
-        # Reject it
-        r = client.get(f"/invoices/approval/{approval_id}/reject")
-        assert r.status_code == 200
-        assert "Invoice Rejected" in r.text
+    # Reject it
+    r = client.get(f"/invoices/approval/{approval_id}/reject")
+    assert r.status_code == 200
+    assert "Invoice Rejected" in r.text
 
-        # Verify rejection
-        r = client.get("/invoices/approvals")
-        approvals = r.json()["approvals"]
-        assert approvals[0]["status"] == "rejected"
+    # Verify rejection
+    r = client.get("/invoices/approvals")
+    approvals = r.json()["approvals"]
+    assert approvals[0]["status"] == "rejected"
 
 
-def test_duplicate_approval_prevented():
+def test_duplicate_approval_prevented(client, mock_webhook):
     """Test that duplicate approvals are prevented"""
     settings.teams_webhook_url = "https://example.com/webhook"
-    approval_tracker._approvals.clear()
 
-    with respx.mock:
-        respx.post("https://example.com/webhook").mock(return_value=httpx.Response(200))
+    # Create and approve
+    payload = {"vendor": "Duplicate Test", "total": 50.0}
+    r = client.post("/invoices/request-approval", json=payload)
+    approval_id = r.json()["approval_id"]
 
-        # Create and approve
-        payload = {"vendor": "Duplicate Test", "total": 50.0}
-        r = client.post("/invoices/request-approval", json=payload)
-        approval_id = r.json()["approval_id"]
-
-        # First approval
-        r = client.get(f"/invoices/approval/{approval_id}/approve")
-        assert r.status_code == 200
+    # First approval
+    r = client.get(f"/invoices/approval/{approval_id}/approve")
+    assert r.status_code == 200
 
-        # Try to approve again
-        r = client.get(f"/invoices/approval/{approval_id}/approve")
-        assert r.status_code == 200
-        assert "Already Processed" in r.text
+    # Try to approve again
+    r = client.get(f"/invoices/approval/{approval_id}/approve")
+    assert r.status_code == 200
+    assert "Already Processed" in r.text
 
 
-def test_nonexistent_approval_returns_404():
+def test_nonexistent_approval_returns_404(client):
     """Test that nonexistent approval returns 404"""
     r = client.get("/invoices/approval/nonexistent-id/approve")
     assert r.status_code == 404
 
 
-def test_list_empty_approvals():
+def test_list_empty_approvals(client):
     """Test listing when no approvals exist"""
-    approval_tracker._approvals.clear()
     r = client.get("/invoices/approvals")
     assert r.status_code == 200
     assert r.json()["approvals"] == []
@@ -116,8 +97,6 @@ def test_list_empty_approvals():
 
 def test_approval_tracker_methods():
     """Test approval tracker edge cases"""
-    approval_tracker._approvals.clear()
-
     # Test approve on non-existent
     result = approval_tracker.approve("fake-id")
     assert result is False
@@ -144,22 +123,21 @@ def test_approval_tracker_methods():
     assert approval["decided_by"] == "testuser"
 
 
-def test_list_approved_invoices():
+def test_list_approved_invoices(client):
     """Test listing approved invoices with filtering"""
-    approval_tracker._approvals.clear()
-
     # Create mix of approved, rejected, and pending
-    id1 = approval_tracker.create_approval({"vendor": "Auto Corp", "confidence": 0.95})
+    id1, id2, id3, _ = approval_tracker.create_many(
+        [
+            {"vendor": "Auto Corp", "confidence": 0.95},
+            {"vendor": "Manual Corp", "confidence": 0.75},
+            {"vendor": "Rejected Corp", "confidence": 0.60},
+            {"vendor": "Pending Corp", "confidence": 0.80},
+        ]
+    )
     approval_tracker.approve(id1, "system-auto")
-
-    id2 = approval_tracker.create_approval({"vendor": "Manual Corp", "confidence": 0.75})
     approval_tracker.approve(id2, "user")
-
-    id3 = approval_tracker.create_approval({"vendor": "Rejected Corp", "confidence": 0.60})
     approval_tracker.reject(id3, "user")
 
-    id4 = approval_tracker.create_approval({"vendor": "Pending Corp", "confidence": 0.80})
-
     # Test the endpoint
     r = client.get("/invoices/approvals/approved")
     assert r.status_code == 200
@@ -171,13 +149,107 @@ def test_list_approved_invoices():
     # Check details
     invoices = data["invoices"]
     assert len(invoices) == 2
+    by_vendor = {inv["vendor"]: inv for inv in invoices}
 
     # Find the auto-approved one
-    auto = next(inv for inv in invoices if inv["vendor"] == "Auto Corp")
+    auto = by_vendor["Auto Corp"]
     assert auto["approval_type"] == "AI Auto-Approved"
     assert auto["approved_by"] == "system-auto"
 
     # Find the human-approved one
-    manual = next(inv for inv in invoices if inv["vendor"] == "Manual Corp")
+    manual = by_vendor["Manual Corp"]
     assert manual["approval_type"] == "Human Approved"
     assert manual["approved_by"] == "user"
+
+
+def test_list_approved_newest_first_and_excludes_reversed_decisions(client):
+    """Approved listing is ordered by approval time and drops later rejections"""
+    first = approval_tracker.create_approval({"vendor": "First Corp"})
+    second = approval_tracker.create_approval({"vendor": "Second Corp"})
+    reversed_id = approval_tracker.create_approval({"vendor": "Reversed Corp"})
+
+    approval_tracker.approve(first)
+    approval_tracker.approve(second)
+    approval_tracker.approve(reversed_id)
+    approval_tracker.reject(reversed_id)
+
+    approved = approval_tracker.list_approved()
+    assert [a["id"] for a in approved] == [second, first]
+
+    r = client.get("/invoices/approvals/approved")
+    data = r.json()
+    assert data["total_approved"] == 2
+    assert [inv["vendor"] for inv in data["invoices"]] == ["Second Corp", "First Corp"]
+
+
+def test_list_approved_invoices_paging(client):
+    """limit/offset page through approvals newest first; total stays the full count"""
+    ids = [approval_tracker.create_approval({"vendor": f"Vendor {i}"}) for i in range(5)]
+    for approval_id in ids:
+        approval_tracker.approve(approval_id)
+
+    assert [a["id"] for a in approval_tracker.list_approved(limit=2, offset=1)] == [ids[3], ids[2]]
+
+    r = client.get("/invoices/approvals/approved?limit=2&offset=3")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total_approved"] == 5
+    assert [inv["vendor"] for inv in data["invoices"]] == ["Vendor 1", "Vendor 0"]
+
+    r = client.get("/invoices/approvals/approved?limit=0")
+    assert r.status_code == 422
+
+
+def test_tracker_listing_safe_during_concurrent_writes():
+    """Listings taken while other threads create and approve never see a resizing dict"""
+    tracker = ApprovalTracker()
+    errors = []
+
+    def write():
+        for i in range(500):
+            tracker.approve(tracker.create_approval({"vendor": f"Vendor {i}"}))
+
+    def read():
+        try:
+            for _ in range(200):
+                tracker.list_all()
+                tracker.list_approved(limit=10)
+        except RuntimeError as e:  # "dictionary changed size during iteration"
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(2)]
+    threads += [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert tracker.count_approved() == 1000
+
+
+def test_approved_page_and_count_read_together():
+    """Page and total come from one locked read, so the total never lags the page"""
+    tracker = ApprovalTracker()
+    done = threading.Event()
+    mismatches = []
+
+    def write():
+        for i in range(500):
+            tracker.approve(tracker.create_approval({"vendor": f"Vendor {i}"}))
+        done.set()
+
+    def read():
+        while not done.is_set():
+            page, total = tracker.list_approved_with_count()
+            if len(page) != total:
+                mismatches.append((len(page), total))
+
+    threads = [threading.Thread(target=write), threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mismatches == []
+    assert tracker.list_approved_with_count(limit=2)[1] == 500
@@ -1,13 +1,7 @@
-from fastapi.testclient import TestClient
-from src.api.main import app
 from src.core.config import settings
-import respx
-import httpx
 
-client = TestClient(app)
 
-
-def test_approve_skips_without_webhook():
+def test_approve_skips_without_webhook(client):
     # Ensure webhook unset
     settings.teams_webhook_url = None
     r = client.post("/invoices/request-approval", json={"vendor": "Contoso"})
@@ -15,10 +9,8 @@ def test_approve_skips_without_webhook():
     assert r.json()["result"]["status"] == "skipped"
 
 
-@respx.mock
-def test_approve_posts_adaptive_card():
+def test_approve_posts_adaptive_card(client, mock_webhook):
     settings.teams_webhook_url = "https://example.com/webhook"
-    respx.post("https://example.com/webhook").mock(return_value=httpx.Response(200))
     payload = {
         "vendor": "Contoso",
         "invoice_number": "INV-123",
@@ -1,6 +1,14 @@
 from fastapi.testclient import TestClient
 from src.api.main import app
 from src.core.config import settings
+from src.services.form_recognizer import (
+    _cached_extraction,
+    _document_digest,
+    _parse_invoice_total,
+    _remember_extraction,
+)
+from src.services.invoice_types import ExtractedInvoice
+from types import SimpleNamespace
 import io
 
 client = TestClient(app)
@@ -100,3 +108,51 @@ def test_extract_missing_file_returns_422():
     # 422 Unprocessable Entity
     r = client.post("/invoices/extract")
     assert r.status_code == 422
+
+
+def test_extract_oversized_upload_returns_413():
+    """Uploads above MAX_UPLOAD_BYTES are rejected for both input formats"""
+    original_limit = settings.max_upload_bytes
+    settings.max_upload_bytes = 16
+
+    try:
+        pdf_bytes = b"%PDF-1.4 this body is over the limit"
+        r = client.post(
+            "/invoices/extract", content=pdf_bytes, headers={"Content-Type": "application/pdf"}
+        )
+        assert r.status_code == 413
+
+        files = {"file": ("big.pdf", io.BytesIO(pdf_bytes), "application/pdf")}
+        r = client.post("/invoices/extract", files=files)
+        assert r.status_code == 413
+    finally:
+        settings.max_upload_bytes = original_limit
+
+
+def test_parse_invoice_total_prefers_typed_amount():
+    """Typed DI currency amounts win; text totals are stripped of symbols and codes"""
+    typed = SimpleNamespace(value_currency=SimpleNamespace(amount=1234.56))
+    assert _parse_invoice_total(typed, "garbled") == 1234.56
+
+    assert _parse_invoice_total(None, "$1,234.56") == 1234.56
+    assert _parse_invoice_total(None, "AUD 385.00") == 385.00
+    assert _parse_invoice_total(None, "not a number") == 0.0
+    assert _parse_invoice_total(None, None) == 0.0
+
+
+def test_extraction_cache_keyed_by_document_content():
+    """Same bytes hit the cache whether passed as bytes or a file object"""
+    pdf_bytes = b"%PDF-1.4 cached extraction test"
+    stream = io.BytesIO(pdf_bytes)
+    digest = _document_digest(pdf_bytes)
+
+    assert _document_digest(stream) == digest
+    assert stream.tell() == 0  # rewound for the SDK upload
+
+    extracted = ExtractedInvoice(vendor="Cached Corp", total=42.0)
+    _remember_extraction(digest, extracted)
+
+    cached = _cached_extraction(digest)
+    assert cached == extracted
+    assert cached is not extracted
+    assert _cached_extraction(_document_digest(b"%PDF-1.4 other")) is None
@@ -5,6 +5,9 @@ Verifies that invoice validation events are published to Azure Service Bus
 for downstream processing, integration with other systems, and audit trails.
 """
 
+import json
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch
 from src.services.events.event_publisher import EventPublisher, InvoiceValidatedEvent
@@ -69,6 +72,7 @@ def test_publish_invoice_validated_event(event_publisher, mock_service_bus_sende
     assert "test-456" in str(message)
     assert "Test Vendor" in str(message)
     assert "InvoiceValidated" in str(message)
+    assert message.message_id == "test-456"
 
 
 def test_publish_multiple_events(event_publisher, mock_service_bus_sender):
@@ -99,6 +103,102 @@ def test_publish_multiple_events(event_publisher, mock_service_bus_sender):
     assert mock_service_bus_sender.send_messages.call_count == 2
 
 
+def test_concurrent_publishes_never_overlap_sends(mock_service_bus_sender):
+    """Publishing from several threads calls the (non-thread-safe) sender serially"""
+    active = 0
+    overlapped = False
+    counter_lock = threading.Lock()
+
+    def send_messages(_):
+        nonlocal active, overlapped
+        with counter_lock:
+            active += 1
+            overlapped = overlapped or active > 1
+        time.sleep(0.001)
+        with counter_lock:
+            active -= 1
+
+    mock_service_bus_sender.send_messages.side_effect = send_messages
+    publisher = EventPublisher(service_bus_sender=mock_service_bus_sender)
+    event = InvoiceValidatedEvent(
+        approval_id="concurrent",
+        vendor="Thread Corp",
+        invoice_number="T-1",
+        total=100.00,
+        approved=True,
+        reason="Concurrent",
+        confidence=0.95,
+    )
+
+    threads = [
+        threading.Thread(target=publisher.publish_invoice_validated, args=(event,))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mock_service_bus_sender.send_messages.call_count == 8
+    assert not overlapped
+
+
+def test_publish_batches_messages_when_enabled(mock_service_bus_sender):
+    """With batch_size > 1, messages are sent together once the batch fills"""
+    publisher = EventPublisher(
+        service_bus_sender=mock_service_bus_sender, batch_size=2, flush_interval=60
+    )
+    events = [
+        InvoiceValidatedEvent(
+            approval_id=f"batch-{i}",
+            vendor="Batch Corp",
+            invoice_number=f"B-{i}",
+            total=100.00,
+            approved=True,
+            reason="Batched",
+            confidence=0.95,
+        )
+        for i in range(3)
+    ]
+
+    for event in events:
+        publisher.publish_invoice_validated(event)
+
+    # First two went out as one send; the third waits for the next flush
+    assert mock_service_bus_sender.send_messages.call_count == 1
+    batch = mock_service_bus_sender.send_messages.call_args[0][0]
+    assert [m.message_id for m in batch] == ["batch-0", "batch-1"]
+
+    publisher.flush()
+    assert mock_service_bus_sender.send_messages.call_count == 2
+    assert [m.message_id for m in mock_service_bus_sender.send_messages.call_args[0][0]] == [
+        "batch-2"
+    ]
+
+
+def test_close_flushes_and_releases_exit_hook(mock_service_bus_sender):
+    """close() sends the partial batch and unregisters the atexit flush"""
+    event = InvoiceValidatedEvent(
+        approval_id="close-1",
+        vendor="Close Corp",
+        invoice_number="C-1",
+        total=100.00,
+        approved=True,
+        reason="Closing",
+        confidence=0.95,
+    )
+    with patch("src.services.events.event_publisher.atexit") as mock_atexit:
+        publisher = EventPublisher(
+            service_bus_sender=mock_service_bus_sender, batch_size=10, flush_interval=60
+        )
+        publisher.publish_invoice_validated(event)
+        publisher.close()
+
+    mock_service_bus_sender.send_messages.assert_called_once()
+    mock_atexit.register.assert_called_once_with(publisher.flush)
+    mock_atexit.unregister.assert_called_once_with(publisher.flush)
+
+
 def test_publish_with_null_service_bus_sender():
     """Test that publisher gracefully handles None sender (disabled mode)"""
     publisher = EventPublisher(service_bus_sender=None)
@@ -139,6 +239,8 @@ def test_event_serializes_to_json():
     assert json_data["event_type"] == "InvoiceValidated"
     assert "timestamp" in json_data
 
+    assert json.loads(event.to_json()) == json_data
+
 
 def test_event_includes_metadata():
     """Test that event includes useful metadata for consumers"""
@@ -10,6 +10,7 @@ This test suite verifies that the SQLite ApprovalTracker:
 import pytest
 import sqlite3
 import tempfile
+import threading
 import os
 from datetime import datetime
 from src.services.storage.approvals_sqlite import SQLiteApprovalTracker
@@ -21,15 +22,18 @@ def db_path():
     fd, path = tempfile.mkstemp(suffix=".db")
     os.close(fd)
     yield path
-    # Cleanup
-    if os.path.exists(path):
-        os.remove(path)
+    # Cleanup (including WAL side files)
+    for file_path in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
 
 @pytest.fixture
 def tracker(db_path):
     """Create a fresh SQLiteApprovalTracker for each test"""
-    return SQLiteApprovalTracker(db_path)
+    tracker = SQLiteApprovalTracker(db_path)
+    yield tracker
+    tracker.close()
 
 
 def test_create_approval_persists_to_db(tracker, db_path):
@@ -193,3 +197,81 @@ def test_get_nonexistent_returns_none(tracker):
     """Test that getting non-existent approval returns None"""
     approval = tracker.get_approval("nonexistent-id-67890")
     assert approval is None
+
+
+def test_list_approved_paging_and_count(tracker):
+    """Approved listing pages newest first and count covers all approvals"""
+    ids = [tracker.create_approval({"vendor": v, "total": 100}) for v in "ABC"]
+    for approval_id in ids:
+        tracker.approve(approval_id)
+    tracker.create_approval({"vendor": "D", "total": 100})  # pending
+
+    assert tracker.count_approved() == 3
+    page = tracker.list_approved(limit=1, offset=1)
+    assert [a["invoice_data"]["vendor"] for a in page] == ["B"]
+
+    page, total = tracker.list_approved_with_count(limit=1, offset=1)
+    assert [a["invoice_data"]["vendor"] for a in page] == ["B"]
+    assert total == 3
+
+
+def test_connection_reused_across_calls(tracker):
+    """Each thread keeps one open connection instead of reconnecting per call"""
+    approval_id = tracker.create_approval({"vendor": "A", "total": 100})
+    tracker.approve(approval_id)
+    tracker.get_approval(approval_id)
+
+    assert len(tracker._connections) == 1
+    mode = tracker._get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_connection_closed_when_thread_exits(tracker):
+    """A worker thread's connection is released when the thread finishes"""
+    opened = []
+
+    def work():
+        opened.append(tracker._get_connection())
+        tracker.create_approval({"vendor": "Worker", "total": 100})
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    worker.join()
+
+    assert len(tracker._connections) == 1  # only the main thread's
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+    assert len(tracker.list_all()) == 1
+
+
+def test_failed_write_rolls_back(tracker, monkeypatch):
+    """A write that fails leaves no open transaction on the reused connection"""
+    monkeypatch.setattr("src.services.storage.approvals_sqlite.token_hex", lambda n: "dup-id")
+    tracker.create_approval({"vendor": "A", "total": 100})
+
+    with pytest.raises(sqlite3.IntegrityError):
+        tracker.create_approval({"vendor": "B", "total": 100})
+
+    assert not tracker._get_connection().in_transaction
+    assert tracker.approve("dup-id") is True
+
+
+def test_create_many_inserts_batch(tracker):
+    """Batch creation returns IDs in input order and persists every invoice"""
+    invoices = [{"vendor": v, "total": 100} for v in "ABC"]
+    ids = tracker.create_many(invoices)
+
+    assert len(set(ids)) == 3
+    assert [tracker.get_approval(i)["invoice_data"]["vendor"] for i in ids] == ["A", "B", "C"]
+    assert all(a["status"] == "pending" for a in tracker.list_all())
+
+
+def test_list_all_can_skip_invoice_data(tracker):
+    """Metadata-only listing leaves invoice_data undecoded; totals sum in SQL"""
+    tracker.create_many([{"vendor": "A", "total": 100}, {"vendor": "B", "total": 50.5}])
+
+    approvals = tracker.list_all(include_invoice_data=False)
+    assert [a["invoice_data"] for a in approvals] == [None, None]
+    assert all(a["status"] == "pending" for a in approvals)
+    assert tracker.total_by_status("pending") == 150.5
+    assert tracker.total_by_status("approved") == 0.0
@@ -6,6 +6,7 @@ This endpoint centralizes approval logic that was previously embedded in Logic A
 
 from fastapi.testclient import TestClient
 from src.api.main import app
+from src.api.routers.invoice import ValidateRequest, _validation_id
 
 client = TestClient(app)
 
@@ -168,3 +169,17 @@ def test_validate_edge_case_exactly_500():
     assert data["approved"] is True
     assert data["checks"]["amount_within_limit"] is True
     assert data["checks"]["confidence_sufficient"] is True
+
+
+def test_validation_id_distinguishes_content_and_bill_to():
+    """Validations differing only in content or bill_to get distinct event IDs"""
+    base = {"amount": 450.00, "confidence": 0.92, "vendor": "ACME Corp"}
+    content = "INVOICE\nAmount Due: $450.00"
+    first = ValidateRequest(**base, content=content, bill_to="Contoso")
+    other_content = ValidateRequest(**base, content=content + "\nPO: 1234", bill_to="Contoso")
+    other_bill_to = ValidateRequest(**base, content=content, bill_to="Fabrikam")
+
+    ids = {_validation_id(req, True) for req in (first, other_content, other_bill_to)}
+    assert len(ids) == 3
+    assert _validation_id(first, True) != _validation_id(first, False)
+    assert _validation_id(first, True) == _validation_id(first.model_copy(), True)